@@ -50,10 +50,30 @@ __contributors__ = {}
 __url__ = 'https://github.com/santigl/limnoria-nba'
 
 from . import config
+from . import freshness
+from . import leaders
+from . import packing
+from . import parsecache
+from . import pipeline
+from . import playindex
+from . import sources
+from . import standings
+from . import throttle
+from . import timeline
 from . import plugin
 from imp import reload
 # In case we're being reloaded.
 reload(config)
+reload(freshness)
+reload(leaders)
+reload(packing)
+reload(parsecache)
+reload(playindex)
+reload(sources)
+reload(standings)
+reload(throttle)
+reload(timeline)
+reload(pipeline)
 reload(plugin)
 # Add more reloads here if you add third-party modules and want them to be
 # reloaded when this plugin is reloaded.  Don't forget to import them as well!
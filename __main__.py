@@ -0,0 +1,218 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Run the data pipeline without a bot, eg. from cron, by giving Python the
+plugin's directory:
+
+    python path/to/NFLScores prefetch --data DIR [--mirror DIR]
+    python path/to/NFLScores backfill 2026-09-10 2026-10-12 --data DIR
+    python path/to/NFLScores dump [--team NE] [--status live] [--week 3]
+
+'prefetch' updates the stores in the data directory with today's games,
+optionally saving the raw feed into a mirror for the 'mirror' feed source.
+'backfill' adds past games to the stores, and 'dump' prints the current
+scoreboard in the JSON format of the HTTP endpoint. The data directory is
+created if needed.
+
+Limnoria is not loaded: run this way, the package's __init__.py (the plugin
+itself) isn't either. 'python -m NFLScores' works too, from a directory
+where the plugin is importable, but runs __init__.py first.
+
+The data directory may be the bot's, even while it runs: the stores pick up
+each other's changes. Backfilled games don't go into the timeline, which
+only logs states as they happen. The standings and the play index only keep
+the latest season, so use another directory to backfill an older one."""
+
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+import types
+
+
+def _import(name):
+    """Import one of the plugin's modules. Run from the plugin's directory,
+    this file is not part of a package: register an empty package for the
+    directory instead of importing it, so that the modules' relative
+    imports work without running __init__.py."""
+    package = __package__
+    if not package:
+        path = os.path.dirname(os.path.abspath(__file__))
+        package = os.path.basename(path)
+        if package not in sys.modules:
+            module = types.ModuleType(package)
+            module.__path__ = [path]
+            sys.modules[package] = module
+    return importlib.import_module(package + '.' + name)
+
+
+def _pipeline(args, data=True):
+    """Return a Pipeline configured from the command line. Only imported
+    here, so that '--help' and argument errors stay cheap."""
+    pipeline = _import('pipeline')
+    settings = {'feed.source': args.source,
+                'feed.location': args.location,
+                'feed.seasonType': args.season_type}
+    return pipeline.Pipeline(args.data if data else None, settings)
+
+
+def _mirroring(pipe, mirror):
+    """Make the pipeline write every document it downloads from its feed
+    into the `mirror` directory, laid out as sources.py expects."""
+    base = pipe._source().base
+    getURL = pipe._getURL
+
+    def _getURL(url, use_cache=False):
+        body = getURL(url, use_cache)
+        if url.startswith(base):
+            filename = os.path.join(mirror, url[len(base):].lstrip('/'))
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename + '.tmp', 'wb') as fd:
+                fd.write(body)
+            os.replace(filename + '.tmp', filename)
+        return body
+    pipe._getURL = _getURL
+
+
+def prefetch(args):
+    pipe = _pipeline(args)
+    if args.mirror:
+        _mirroring(pipe, args.mirror)
+    try:
+        games = pipe._getGames('ALL', pipe._getTodayDate())
+    finally:
+        pipe.close()
+    logging.info('%d games fetched.', len(games))
+
+
+def backfill(args):
+    """Probe the game-center documents of each day in the range (eids are
+    YYYYMMDD00, YYYYMMDD01, ...) and feed them to the stores. Games from
+    September to December count as regular season games."""
+    pipe = _pipeline(args)
+    if args.mirror:
+        _mirroring(pipe, args.mirror)
+    url = pipe._source().gameURL()
+    day = args.start
+    count = 0
+    try:
+        while day <= args.end:
+            for n in range(100):
+                eid = '{:%Y%m%d}{:02d}'.format(day, n)
+                try:
+                    document = pipe._extractJSON(
+                        pipe._getURL(url.format(eid, eid)))[eid]
+                except (OSError, ValueError, KeyError):
+                    break
+                season = day.year - 1 if day.month < 3 else day.year
+                game = {'eid': eid,
+                        'wday': day.strftime('%a'),
+                        'year': str(season),
+                        'month': day.month,
+                        'day': day.day,
+                        'time': '',
+                        'meridiem': None,
+                        'season_type': 'REG' if day.month >= 9 else None,
+                        'week': None,
+                        'week_number': None,
+                        'home': document['home']['abbr'],
+                        'away': document['away']['abbr'],
+                        'gamekey': None,
+                        'json': document}
+                pipe._ingest(game, live=False)
+                pipe._parseGames([game], 'ALL')
+                count += 1
+            day += datetime.timedelta(days=1)
+    finally:
+        pipe.close()
+    logging.info('%d games backfilled.', count)
+
+
+def dump(args):
+    pipe = _pipeline(args, data=False)
+    games = pipe._getGames('ALL', pipe._getTodayDate())
+    json.dump({'updated': int(time.time()),
+               'games': pipe._snapshotGames(games, args.team.upper(),
+                                            args.status, args.week)},
+              sys.stdout, indent=1)
+    sys.stdout.write('\n')
+
+
+def _date(string):
+    return datetime.datetime.strptime(string, '%Y-%m-%d').date()
+
+
+def _directory(string):
+    try:
+        os.makedirs(string, exist_ok=True)
+    except OSError as e:
+        raise argparse.ArgumentTypeError(
+            'cannot create directory {!r}: {}'.format(string, e.strerror))
+    return string
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='NFLScores',
+                                     description=__doc__.split('\n')[0])
+    parser.add_argument('--source', default='nfl', choices=('nfl', 'mirror'),
+                        help='feed source (plugins.NFLScores.feed.source)')
+    parser.add_argument('--location', default='',
+                        help='feed location (plugins.NFLScores.feed.location)')
+    parser.add_argument('--season-type', default='auto',
+                        choices=('auto', 'regular', 'postseason'),
+                        help='scorestrip to use '
+                             '(plugins.NFLScores.feed.seasonType)')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    command = commands.add_parser('prefetch', help="fetch today's games")
+    command.add_argument('--data', required=True, type=_directory,
+                         help='data directory of the stores')
+    command.add_argument('--mirror', help='also save the feed there')
+    command.set_defaults(run=prefetch)
+
+    command = commands.add_parser('backfill', help='fetch past games')
+    command.add_argument('start', type=_date, help='YYYY-MM-DD')
+    command.add_argument('end', type=_date, help='YYYY-MM-DD')
+    command.add_argument('--data', required=True, type=_directory,
+                         help='data directory of the stores')
+    command.add_argument('--mirror', help='also save the feed there')
+    command.set_defaults(run=backfill)
+
+    command = commands.add_parser('dump', help='print the scoreboard as JSON')
+    command.add_argument('--team', default='')
+    command.add_argument('--status', default='',
+                         choices=('', 'pregame', 'live', 'halftime', 'final'))
+    command.add_argument('--week', default='')
+    command.set_defaults(run=dump)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(levelname)s %(message)s')
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
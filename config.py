@@ -53,5 +53,89 @@ NFLScores = conf.registerPlugin('NFLScores')
 # conf.registerGlobalValue(NBA, 'someConfigVariableName',
 #     registry.Boolean(False, _("""Help for someConfigVariableName.""")))
 
+class FeedSource(registry.OnlySomeStrings):
+    validStrings = ('nfl', 'mirror')
+
+class SeasonType(registry.OnlySomeStrings):
+    validStrings = ('auto', 'regular', 'postseason')
+
+conf.registerGroup(NFLScores, 'feed')
+conf.registerGlobalValue(NFLScores.feed, 'source',
+    FeedSource('nfl', _("""Determines where scores are downloaded from:
+    'nfl' for NFL.com's live feed, 'mirror' for a local copy of it (see
+    feed.location).""")))
+conf.registerGlobalValue(NFLScores.feed, 'location',
+    registry.String('', _("""Determines the root of the feed: for the
+    'mirror' source, a directory or file:// URL laid out like NFL.com's
+    liveupdate tree (scorestrip/ss.xml, scorestrip/postseason/ss.xml,
+    game-center/<eid>/<eid>_gtd.json). Empty means NFL.com for the 'nfl'
+    source.""")))
+conf.registerGlobalValue(NFLScores.feed, 'seasonType',
+    SeasonType('auto', _("""Determines which scorestrip is used: 'regular',
+    'postseason', or 'auto' to try the postseason one first in January and
+    February.""")))
+
+conf.registerGlobalValue(NFLScores, 'parseCacheSize',
+    registry.PositiveInteger(64, _("""Determines how many parsed schedules
+    and game documents are kept, so that byte-identical responses from
+    NFL.com are not parsed again.""")))
+conf.registerGlobalValue(NFLScores, 'lineBytes',
+    registry.PositiveInteger(512, _("""Determines the maximum length (in
+    bytes) of the lines the IRC server relays, hostmask and command
+    included. The scores are packed into as few lines of that size as
+    possible, one game never being split across lines.""")))
+
+conf.registerGroup(NFLScores, 'freshness')
+conf.registerGlobalValue(NFLScores.freshness, 'live',
+    registry.PositiveInteger(10, _("""Determines how long (in seconds) the
+    game-center data of a game in progress is reused. Data of final games
+    is never downloaded again.""")))
+conf.registerGlobalValue(NFLScores.freshness, 'halftime',
+    registry.PositiveInteger(60, _("""Determines how long (in seconds) the
+    game-center data of a game at halftime is reused.""")))
+conf.registerGlobalValue(NFLScores.freshness, 'missing',
+    registry.PositiveInteger(120, _("""Determines how long (in seconds) to
+    wait before asking again for game-center data that wasn't
+    available.""")))
+conf.registerGlobalValue(NFLScores.freshness, 'pregame',
+    registry.PositiveInteger(1800, _("""Determines how long (in seconds)
+    before kickoff the game-center data of a game starts being
+    downloaded.""")))
+
+conf.registerGroup(NFLScores, 'throttle')
+conf.registerGlobalValue(NFLScores.throttle, 'enable',
+    registry.Boolean(True, _("""Determines whether the nfl and nflgamestats
+    commands are rate-limited per user and per channel. Throttled requests
+    are answered from the last reply to the same request, if any.""")))
+conf.registerGlobalValue(NFLScores.throttle, 'replyMaxAge',
+    registry.PositiveInteger(120, _("""Determines how old (in seconds) a
+    reply may be to be given again to a throttled request.""")))
+conf.registerGroup(NFLScores.throttle, 'user')
+conf.registerGlobalValue(NFLScores.throttle.user, 'burst',
+    registry.PositiveInteger(3, _("""Determines how many requests a user
+    can make in a row.""")))
+conf.registerGlobalValue(NFLScores.throttle.user, 'period',
+    registry.PositiveInteger(30, _("""Determines how long (in seconds) it
+    takes for a user to be allowed one more request.""")))
+conf.registerGroup(NFLScores.throttle, 'channel')
+conf.registerGlobalValue(NFLScores.throttle.channel, 'burst',
+    registry.PositiveInteger(6, _("""Determines how many requests can be
+    made in a row in a channel. Users who haven't made any request lately
+    are not held back by this limit.""")))
+conf.registerGlobalValue(NFLScores.throttle.channel, 'period',
+    registry.PositiveInteger(10, _("""Determines how long (in seconds) it
+    takes for a channel to be allowed one more request.""")))
+
+conf.registerGroup(NFLScores, 'web')
+conf.registerGlobalValue(NFLScores.web, 'enable',
+    registry.Boolean(False, _("""Determines whether the current scoreboard
+    snapshot is served as JSON on the bot's HTTP server, under /nflscores/.
+    Filters are given as query parameters, eg.
+    /nflscores/?team=KC&status=live&week=5""")))
+conf.registerGlobalValue(NFLScores.web, 'maxAge',
+    registry.PositiveInteger(60, _("""Determines how old (in seconds) the
+    scoreboard snapshot may get before an HTTP request (or nflleaders)
+    refreshes it from NFL.com.""")))
+
 
 # vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
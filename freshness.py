@@ -0,0 +1,74 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Per-game cache of the game-center documents, where each document expires
+according to the state of its game: final games never expire, games far
+from kickoff are not fetched at all, missing documents are remembered for a
+little while, and live games expire quickly."""
+
+from collections import namedtuple
+
+FOREVER = float('inf')
+
+# Seconds, as configured in plugins.NFLScores.freshness.
+Policy = namedtuple('Policy', 'live halftime missing pregame')
+
+
+def expiry(document, kickoff, now, policy):
+    """Return the time until which a game's document (None if it could not
+    be fetched) can be reused."""
+    if document is None:
+        # There's usually nothing to get until shortly before kickoff.
+        return max(now + policy.missing, kickoff - policy.pregame)
+    qtr = document.get('qtr')
+    if qtr in ('Final', 'final overtime'):
+        return FOREVER
+    elif qtr == 'Halftime':
+        return now + policy.halftime
+    elif qtr == 'Pregame' or qtr is None:
+        return max(now + policy.live, kickoff - policy.pregame)
+    return now + policy.live
+
+
+class GameCache(object):
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, eid, now):
+        """Return (True, document) if the cached document of the game (which
+        may be None) is still fresh, (False, None) otherwise."""
+        entry = self._entries.get(eid)
+        if entry is None or entry[0] <= now:
+            return (False, None)
+        return (True, entry[1])
+
+    def put(self, eid, document, expires):
+        # Copy-on-write, like the leaders: commands running in other threads
+        # may be going through the entries.
+        entries = dict(self._entries)
+        entries[eid] = (expires, document)
+        self._entries = entries
+
+    def retain(self, eids):
+        """Forget about the games that are not in `eids` anymore."""
+        eids = set(eids)
+        self._entries = dict((eid, entry)
+                             for (eid, entry) in self._entries.items()
+                             if eid in eids)
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
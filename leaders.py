@@ -0,0 +1,119 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Player stat leaders, extracted from the game-center (gtd.json) documents
+once per game refresh."""
+
+import heapq
+import itertools
+import threading
+
+# category -> (section of the team's 'stats', stat to rank by, detail format)
+CATEGORIES = {
+    'passing': ('passing', 'yds', '{cmp}/{att} {yds} yds {tds} TD {ints} INT'),
+    'rushing': ('rushing', 'yds', '{att} car {yds} yds {tds} TD'),
+    'receiving': ('receiving', 'yds', '{rec} rec {yds} yds {tds} TD'),
+    'sacks': ('defense', 'sk', '{sk} sk {tkl} tkl'),
+}
+
+
+class Leaders(object):
+    """Leader tables per game and team, and for the whole slate. Each team
+    of a game keeps its top `size` players per category; since a player only
+    appears in one game, the slate's (and a team's) leaders are always among
+    those, so they are found by merging the (small) per-team tables."""
+    def __init__(self, size=5):
+        self.size = size
+        self._games = {}
+        self._slate = {}
+        self._documents = {}
+        # Writers only (the HTTP refresh and commands may update the tables
+        # at the same time); readers get the published tables.
+        self._lock = threading.Lock()
+
+    def update(self, eid, home, away, game):
+        """(Re)extract the leaders of the given game from its gtd.json
+        document, and refresh the slate tables. Parsed documents are
+        memoized, so getting the same object again means nothing changed."""
+        if self._documents.get(eid) is game:
+            return
+
+        # category -> team -> top entries
+        tables = {}
+        for (category, (section, stat, detail)) in CATEGORIES.items():
+            tables[category] = {}
+            for (side, team) in (('home', home), ('away', away)):
+                entries = []
+                try:
+                    players = game[side]['stats'][section]
+                except (KeyError, TypeError):
+                    continue
+                for player in players.values():
+                    try:
+                        if not player[stat]:
+                            continue
+                        entries.append((float(player[stat]), player['name'],
+                                        team, detail.format(**player)))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                tables[category][team] = heapq.nlargest(self.size, entries)
+
+        # Copy-on-write, so that concurrent lookups never see a half-updated
+        # table. The document is only marked as seen once its tables are
+        # published.
+        with self._lock:
+            games = dict(self._games)
+            games[eid] = tables
+            self._games = games
+            self._updateSlate()
+            self._documents[eid] = game
+
+    def retain(self, eids):
+        """Forget about the games that are not in `eids` anymore (eg. when
+        the scorestrip moves on to the next week)."""
+        eids = set(eids)
+        with self._lock:
+            for eid in set(self._documents) - eids:
+                del self._documents[eid]
+            if not eids.issuperset(self._games):
+                self._games = dict((eid, tables)
+                                   for (eid, tables) in self._games.items()
+                                   if eid in eids)
+                self._updateSlate()
+
+    def _updateSlate(self):
+        games = self._games.values()
+        self._slate = dict(
+            (category, heapq.nlargest(self.size, itertools.chain(
+                *(entries for tables in games
+                  for entries in tables[category].values()))))
+            for category in CATEGORIES)
+
+    def get(self, category, team=None):
+        """Return the leaders of a category as a list of
+        (value, name, team, detail) tuples, optionally for a single team."""
+        if team is None:
+            return self._slate.get(category, [])
+        return heapq.nlargest(self.size, itertools.chain(
+            *(tables[category].get(team, [])
+              for tables in self._games.values())))
+
+    def __len__(self):
+        return len(self._games)
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
@@ -0,0 +1,63 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Packing of formatted items (eg. one per game) into as few IRC lines as
+possible, without splitting any item. Sizes are in bytes of UTF-8, so the
+formatting codes (bold, colors) count too."""
+
+
+def size(s):
+    return len(s.encode('utf-8'))
+
+
+def pack(items, limit, prefix='', separator=' | '):
+    """Join the items, in order, into lines of at most `limit` bytes, the
+    first one starting with `prefix`. Each line takes as many items as fit
+    (which gives the fewest lines when the order is kept); an item too long
+    for any line gets one of its own, to be split by Limnoria."""
+    lines = []
+    line = prefix
+    empty = True
+    for item in items:
+        if empty:
+            line += item
+            empty = False
+        elif size(line) + size(separator) + size(item) <= limit:
+            line += separator + item
+        else:
+            lines.append(line)
+            line = item
+    if not empty:
+        lines.append(line)
+    return lines
+
+
+def refit(lines, limit, separator=' | '):
+    """Make lines packed for another line size (eg. a reply sent to a
+    channel with a shorter name) fit in `limit` bytes: the lines too long
+    are split again between their items."""
+    fitted = []
+    for line in lines:
+        if size(line) <= limit:
+            fitted.append(line)
+        else:
+            fitted.extend(pack(line.split(separator), limit,
+                               separator=separator))
+    return fitted
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
@@ -0,0 +1,62 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Memoization of parsed documents, keyed by a hash of the raw response
+body. NFL.com often answers with a 200 and a byte-identical body, in which
+case there is no need to parse it again."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ParseCache(object):
+    """Bounded LRU mapping (kind, body hash, extra key) to parsed objects.
+    Cached objects are shared between callers and must be treated as
+    read-only."""
+    def __init__(self, size=64):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind, body, parse, *extra):
+        """Return parse(body), reusing the previous result if a body with
+        the same content was already parsed as `kind` (with the same
+        `extra` key)."""
+        key = (kind, hashlib.blake2b(body, digest_size=16).digest()) + extra
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = parse(body)
+
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        return (self.hits, self.misses, len(self._entries))
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
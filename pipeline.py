@@ -0,0 +1,759 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""The data pipeline: downloading and parsing the scorestrip and the
+game-center documents, and feeding the stores. It doesn't depend on
+Limnoria, so that it can be used without a bot (see __main__.py)."""
+
+import datetime
+import dateutil.parser
+import json
+import logging
+import os
+import pytz
+import time
+import urllib.request
+import lxml.etree as lxml
+from collections import namedtuple
+
+from . import freshness
+from . import leaders
+from . import parsecache
+from . import playindex
+from . import sources
+from . import standings
+from . import timeline
+
+# Same as the defaults in config.py, for use outside of the bot.
+DEFAULTS = {
+    'feed.source': 'nfl',
+    'feed.location': '',
+    'feed.seasonType': 'auto',
+    'parseCacheSize': 64,
+    'freshness.live': 10,
+    'freshness.halftime': 60,
+    'freshness.missing': 120,
+    'freshness.pregame': 1800,
+}
+
+# A downloaded document and its Last-Modified header, for 'If-Modified-Since'.
+CachedResponse = namedtuple('CachedResponse', 'last_modified data')
+
+# The parsed games of the week as of `time`, and the 'nfl' reply packed for
+# each line size in `lines`, built when the snapshot is published. `bodies`
+# holds the serialized games, built on demand by the HTTP callback.
+Snapshot = namedtuple('Snapshot', 'games time lines bodies')
+
+
+class Pipeline(object):
+    """Mixed into the plugin (whose registryValue then takes precedence), or
+    used on its own with a dict of settings overriding DEFAULTS. The on-disk
+    stores (standings, timeline, plays) are only used when given a data
+    directory."""
+    log = logging.getLogger('NFLScores')
+
+    def __init__(self, data_dir=None, settings=None):
+        self.settings = settings or {}
+
+        #self._FUZZY_DAYS = ['yesterday', 'tonight', 'today', 'tomorrow']
+
+        # The latest data acquired from the server for today's URLs, as a
+        # dict of URL -> CachedResponse. It is used to employ HTTP's
+        # 'If-Modified-Since' header and avoid unnecessary downloads for
+        # today's information (which will be requested all the time to update
+        # the scores). Commands run in several threads: the dict is never
+        # modified, only replaced by an updated copy, so readers don't lock.
+        self._today_scores = {}
+
+        # Parsed schedules and game documents, keyed by a hash of the
+        # response body.
+        self._parse_cache = parsecache.ParseCache(
+            self.registryValue('parseCacheSize'))
+
+        # Game-center documents, each with an expiry depending on the state
+        # of the game.
+        self._game_cache = freshness.GameCache()
+
+        # Player stat leaders, updated each time a game's JSON changes.
+        self._leaders = leaders.Leaders()
+
+        self._standings = self._timeline = self._plays = None
+        if data_dir is not None:
+            # Regular season standings, updated as games go final.
+            self._standings = standings.Standings(
+                os.path.join(data_dir, 'NFLScores.standings.json'))
+
+            # Every game state seen, for 'nflat'.
+            self._timeline = timeline.Timeline(
+                os.path.join(data_dir, 'NFLScores.timeline.db'))
+
+            # Full-text index of the season's plays, for 'nflsearch'.
+            self._plays = playindex.PlayIndex(
+                os.path.join(data_dir, 'NFLScores.plays.db'))
+
+    def registryValue(self, name):
+        return self.settings.get(name, DEFAULTS[name])
+
+    def close(self):
+        if self._timeline is not None:
+            self._timeline.close()
+        if self._plays is not None:
+            self._plays.close()
+
+############################
+# Content-getting helpers
+############################
+    def _getGames(self, team, date):
+        """Given a date, populate the url with it and try to download its
+        content. If successful, parse the JSON data and extract the relevant
+        fields for each game. Returns a list of games."""
+        source = self._source()
+
+        # (If asking for today's results, enable the 'If-Mod.-Since' flag)
+        use_cache = (date == self._getTodayDate())
+        response = self._getSchedule(source, use_cache)
+        games = self._getGamesSch(response, team)
+        if team == 'ALL':
+            self._leaders.retain([g['eid'] for g in games])
+            self._game_cache.retain([g['eid'] for g in games])
+        games = self._getGamesJson(source.gameURL(), games, use_cache)
+        games = self._parseGames(games, team)
+
+        return games
+
+    def _getGameStats(self, team, date):
+        """Given a date, populate the url with it and try to download its
+        content. If successful, parse the JSON data and extract the relevant
+        fields for each game. Returns a list of games."""
+        source = self._source()
+
+        # (If asking for today's results, enable the 'If-Mod.-Since' flag)
+        use_cache = (date == self._getTodayDate())
+        response = self._getSchedule(source, use_cache)
+        games = self._getGamesSch(response, team)
+        #print(games)
+        games = self._getGamesJson(source.gameURL(), games, use_cache)
+        games = self._parseStats(games, team)
+
+        return games
+
+    def _source(self):
+        return sources.get(self.registryValue('feed.source'),
+                           self.registryValue('feed.location'),
+                           self.registryValue('feed.seasonType'))
+
+    def _getSchedule(self, source, use_cache):
+        """Download the scorestrip from the feed source. When more than one
+        scorestrip may apply (see sources.Source), the first one that lists
+        any game is used."""
+        urls = source.scheduleURLs(self._easternTimeNow())
+        for url in urls:
+            last = (url == urls[-1])
+            try:
+                response = self._getURL(url, use_cache)
+            except OSError:
+                if last:
+                    raise
+                continue
+            if last or b'<g ' in response:
+                return response
+
+    def _getGamesJson(self, url, data, use_cache):
+        """Attach its game-center document to each game (None if there is
+        none yet). For today's games, documents are reused until they expire
+        according to the state of the game (see the freshness module)."""
+        now = time.time()
+        policy = freshness.Policy(
+            *(self.registryValue('freshness.' + name)
+              for name in freshness.Policy._fields))
+
+        for game in data:
+            if use_cache:
+                (fresh, document) = self._game_cache.get(game['eid'], now)
+                if fresh:
+                    game['json'] = document
+                    continue
+
+            kickoff = self._kickoff(game)
+            if use_cache and kickoff - policy.pregame > now:
+                # Too early, there's no point in asking.
+                game['json'] = None
+            else:
+                url2 = url.format(game['eid'], game['eid'])
+                try:
+                    response = self._getURL(url2)
+                    json = self._extractJSON(response)
+                    game['json'] = json[game['eid']]
+                except (OSError, ValueError, KeyError) as e:
+                    self.log.debug('No game-center data for %s: %s',
+                                   game['eid'], e)
+                    game['json'] = None
+                else:
+                    self._ingest(game)
+
+            if use_cache:
+                self._game_cache.put(game['eid'], game['json'],
+                                     freshness.expiry(game['json'], kickoff,
+                                                      now, policy))
+
+        return data
+
+    def _ingest(self, game, live=True):
+        """Feed a freshly downloaded game-center document to the stores
+        (leaders, and the on-disk ones if there are any). A store failing
+        doesn't fail the command that fetched the document. The timeline
+        stamps states with the time they are recorded, so it only gets
+        `live` documents, not ones fetched after the fact."""
+        self._leaders.update(game['eid'], game['home'], game['away'],
+                             game['json'])
+        try:
+            if live and self._timeline is not None:
+                self._timeline.record(game['eid'], game['home'],
+                                      game['away'], game['json'])
+            if self._plays is not None:
+                self._plays.add(game['eid'], game['year'],
+                                game['week_number'], game['home'],
+                                game['away'], game['json'])
+        except Exception:
+            self.log.exception('Could not store the game-center data of %s.',
+                               game['eid'])
+
+    def _kickoff(self, game):
+        """Get the earliest possible kickoff time (as a timestamp) of a
+        scorestrip game. The scorestrip doesn't say AM or PM, and the
+        meridiem from _parseSchedule is only a guess: 9 to 11 o'clock is
+        taken as the morning (eg. London games), since fetching a game's
+        data too early only costs requests, while too late hides the
+        game. Earlier hours are always in the afternoon or evening."""
+        (hour, minute) = [int(x) for x in game['time'].split(':')]
+        if hour < 9:
+            hour += 12
+        kickoff = datetime.datetime(int(game['eid'][:4]), game['month'],
+                                    game['day'], hour, minute)
+        return pytz.timezone('US/Eastern').localize(kickoff).timestamp()
+
+    def _getGamesSch(self, data, team):
+        """Parse the scorestrip, reusing the previous result when the body
+        didn't change. (The filters for 'TODAY' and friends depend on the
+        current day too.)"""
+        games = self._parse_cache.get(
+            'schedule', data, lambda body: self._parseSchedule(body, team),
+            team, datetime.datetime.now().day)
+        # The games get their JSON attached later on; don't let that leak
+        # into the cached copies.
+        return [dict(g) for g in games]
+
+    def _parseSchedule(self, data, team):
+        xml = lxml.fromstring(data)
+        games = []
+        for g in xml.xpath("//g"):
+            # For a specific team, only parse out that team
+            if team in g.get('h') or team in g.get('v'):
+                gsis_id = g.get('eid')
+                games.append({
+                    'eid': gsis_id,
+                    'wday': g.get('d'),
+                    'year': xml.find("gms").get('y'),
+                    'month': int(gsis_id[4:6]),
+                    'day': int(gsis_id[6:8]),
+                    'time': g.get('t'),
+                    'meridiem': None,
+                    'season_type': g.get('gt'),
+                    'week': None,
+                    'home': g.get('h'),
+                    'away': g.get('v'),
+                    'gamekey': g.get('gsis'),
+                })
+            # For every team, or and for games in progress
+            elif team == 'ALL' or team == '--IP':
+                gsis_id = g.get('eid')
+                games.append({
+                    'eid': gsis_id,
+                    'wday': g.get('d'),
+                    'year': xml.find("gms").get('y'),
+                    'month': int(gsis_id[4:6]),
+                    'day': int(gsis_id[6:8]),
+                    'time': g.get('t'),
+                    'meridiem': None,
+                    'season_type': g.get('gt'),
+                    'week': xml.find("gms").get('w'),
+                    'home': g.get('h'),
+                    'away': g.get('v'),
+                    'gamekey': g.get('gsis'),
+                })
+            # For games just today
+            elif team == 'TODAY':
+                gsis_id = g.get('eid')
+                tdate = datetime.datetime.now().day
+                if tdate == int(gsis_id[6:8]):
+                    games.append({
+                        'eid': gsis_id,
+                        'wday': g.get('d'),
+                        'year': xml.find("gms").get('y'),
+                        'month': int(gsis_id[4:6]),
+                        'day': int(gsis_id[6:8]),
+                        'time': g.get('t'),
+                        'meridiem': None,
+                        'season_type': g.get('gt'),
+                        'week': None,
+                        'home': g.get('h'),
+                        'away': g.get('v'),
+                        'gamekey': g.get('gsis'),
+                    })
+            # For games just tomorrow
+            elif team == 'TOMORROW':
+                gsis_id = g.get('eid')
+                tdate = datetime.datetime.now().day + 1
+                if tdate == int(gsis_id[6:8]):
+                    games.append({
+                        'eid': gsis_id,
+                        'wday': g.get('d'),
+                        'year': xml.find("gms").get('y'),
+                        'month': int(gsis_id[4:6]),
+                        'day': int(gsis_id[6:8]),
+                        'time': g.get('t'),
+                        'meridiem': None,
+                        'season_type': g.get('gt'),
+                        'week': None,
+                        'home': g.get('h'),
+                        'away': g.get('v'),
+                        'gamekey': g.get('gsis'),
+                    })
+            # For games just yesterday
+            elif team == 'YESTERDAY':
+                gsis_id = g.get('eid')
+                tdate = datetime.datetime.now().day - 1
+                if tdate == int(gsis_id[6:8]):
+                    games.append({
+                        'eid': gsis_id,
+                        'wday': g.get('d'),
+                        'year': xml.find("gms").get('y'),
+                        'month': int(gsis_id[4:6]),
+                        'day': int(gsis_id[6:8]),
+                        'time': g.get('t'),
+                        'meridiem': None,
+                        'season_type': g.get('gt'),
+                        'week': None,
+                        'home': g.get('h'),
+                        'away': g.get('v'),
+                        'gamekey': g.get('gsis'),
+                    })
+
+            # This runs for the '*' argument
+            elif 'FINAL' in team:
+                gsis_id = g.get('eid')
+                games.append({
+                    'eid': gsis_id,
+                    'wday': g.get('d'),
+                    'year': xml.find("gms").get('y'),
+                    'month': int(gsis_id[4:6]),
+                    'day': int(gsis_id[6:8]),
+                    'time': g.get('t'),
+                    'meridiem': None,
+                    'season_type': g.get('gt'),
+                    'week': xml.find("gms").get('w'),
+                    'home': g.get('h'),
+                    'away': g.get('v'),
+                    'gamekey': g.get('gsis'),
+                })
+
+        # 'week' is only set for the listings that show it.
+        week = xml.find("gms").get('w')
+        for game in games:
+            game['week_number'] = week
+
+        for game in games:
+            h = int(game['time'].split(':')[0])
+            m = int(game['time'].split(':')[1])
+            if 0 < h <= 12:  # All games before "9:00" are PM until proven otherwise
+                game['meridiem'] = 'PM'
+
+            if game['meridiem'] is None:
+
+                days_games = [g for g in games if g['wday'] == game['wday']]
+                preceeding = [g for g in days_games if g['eid'] < game['eid']]
+                proceeding = [g for g in days_games if g['eid'] > game['eid']]
+
+                #print(days_games, preceeding, proceeding)
+                # for g in proceeding:
+                #     print(g)
+
+                # If any games *after* this one are AM then so is this
+                if any(g['meridiem'] == 'AM' for g in proceeding):
+                    game['meridiem'] = 'AM'
+                # If any games *before* this one are PM then so is this one
+                elif any(g['meridiem'] == 'PM' for g in preceeding):
+                    game['meridiem'] = 'PM'
+                # If any games *after* this one have an "earlier" start it's AM
+                elif any(h > t for t in [int(g['time'].split(':')[0]) for g in proceeding]):
+                    game['meridiem'] = 'AM'
+                # If any games *before* this one have a "later" start time it's PM
+                elif any(h < t for t in [int(g['time'].split(':')[0]) for g in preceeding]):
+                    game['meridiem'] = 'PM'
+
+            if game['meridiem'] is None:
+                if game['wday'] not in ['Sat', 'Sun']:
+                    game['meridiem'] = 'PM'
+                if game['season_type'] == 'POST':
+                    game['meridiem'] = 'PM'
+
+        return games
+
+    def _getURL(self, url, use_cache=False):
+        """Use urllib to download the URL's content. The use_cache flag enables
+        the use of the one-element cache, which will be reserved for today's
+        games URL. (In the future we could implement a real cache with TTLs)."""
+        user_agent = 'Mozilla/5.0 \
+                      (X11; Ubuntu; Linux x86_64; rv:45.0) \
+                      Gecko/20100101 Firefox/45.0'
+        header = {'User-Agent': user_agent}
+
+        # ('If-Modified-Since' to avoid unnecessary downloads.)
+        cached = self._cachedData(url) if use_cache else None
+        if cached is not None:
+            header['If-Modified-Since'] = cached.last_modified
+
+        request = urllib.request.Request(url, headers=header)
+
+        try:
+            response = urllib.request.urlopen(request, timeout=2)
+        except urllib.error.HTTPError as error:
+            if cached is not None and error.code == 304: # Cache hit
+                self.log.info("{} - 304"
+                              "(Last-Modified: "
+                              "{})".format(url, cached.last_modified))
+                return cached.data
+            else:
+                self.log.error("HTTP Error ({}): {}".format(url, error.code))
+                raise
+
+        self.log.info("{} - 200".format(url))
+
+        if not use_cache:
+            return response.read()
+
+        # Updating the cached data:
+        return self._updateCache(url, response).data
+
+    def _extractJSON(self, body):
+        return self._parse_cache.get(
+            'json', body, lambda body: json.loads(body.decode('utf-8')))
+
+    def _parseGames(self, data, team):
+        """Extract all relevant fields from NFL.com's scoreboard.json
+        and return a list of games."""
+        games = []
+        for g in data:
+
+            # Starting times are in UTC. By default, we will show Eastern times.
+            # (In the future we could add a user option to select timezones.)
+            # starting_time = '{} {}{}'.format(g['wday'], g['time'], g['meridiem'])
+            starting_time = '{} {}'.format(g['wday'], g['time'])
+            if not g['json']:
+                game_info = {'home_team': g['home'],
+                             'away_team': g['away'],
+                             'starting_time': starting_time,
+                             'starting_time_TBD': False,
+                             'clock': None,
+                             'period': 0,
+                             'ended': False,
+                             'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
+                             'week_number': g['week_number'],
+                             'date': g['day'],
+                             'eid': g['eid'],
+                            }
+            else:
+                # First see if there's a last play in the json
+                try:
+                    mp = 0
+                    for p,v in g['json']['drives'][str(g['json']['drives']['crntdrv'])]['plays'].items():
+                        if int(p) > mp:
+                            mp = int(p)
+                    try:
+                        lp = g['json']['drives'][str(g['json']['drives']['crntdrv'])]['plays'][str(mp)]['desc']
+                    except:
+                        lp = ''
+                except:
+                    lp = ''
+                game_info = {'home_team': g['home'],
+                             'away_team': g['away'],
+                             'home_score': g['json']['home']['score']['T'],
+                             'away_score': g['json']['away']['score']['T'],
+                             'starting_time': starting_time,
+                             'starting_time_TBD': False,
+                             'clock': g['json']['clock'],
+                             'period': g['json']['qtr'],
+                             'redzone': g['json']['redzone'],
+                             'posteam': g['json']['posteam'],
+                             'yardline': g['json']['yl'],
+                             'down': ('1' if g['json']['down'] is None else g['json']['down']),
+                             'togo': ('' if g['json']['togo'] == 0 else g['json']['togo']),
+                             'lastplay': lp,
+                             'ended': (g['json']['qtr'] == 'Final' or g['json']['qtr'] == 'final overtime'),
+                             'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
+                             'week_number': g['week_number'],
+                             'date': g['day'],
+                             'eid': g['eid'],
+                            }
+                if game_info['ended'] and g['season_type'] == 'REG' and \
+                        self._standings is not None:
+                    self._standings.recordFinal(
+                        g['eid'], g['year'], g['home'], g['away'],
+                        int(game_info['home_score']),
+                        int(game_info['away_score']))
+            if team == "--IP":
+                if game_info['clock'] and not game_info['ended'] and game_info['period'] != 'Pregame':
+                    games.append(game_info)
+            elif team == "NOTFINAL":
+                if not game_info['ended']:
+                    games.append(game_info)
+            elif team == 'FINAL':
+                if game_info['ended']:
+                    games.append(game_info)
+            else:
+                games.append(game_info)
+
+        return games
+
+    def _parseStats(self, data, team):
+        """Extract all relevant fields from NFL.com's scoreboard.json
+        and return a list of games."""
+        games = []
+        for g in data:
+            #print(g['home'], g['away'], team)
+            # Starting times are in UTC. By default, we will show Eastern times.
+            # (In the future we could add a user option to select timezones.)
+            # starting_time = '{} {}{}'.format(g['wday'], g['time'], g['meridiem'])
+            starting_time = '{} {}'.format(g['wday'], g['time'])
+            if not g['json']:
+                game_info = {'home_team': g['home'],
+                             'away_team': g['away'],
+                             'starting_time': starting_time,
+                             'starting_time_TBD': False,
+                             'clock': None,
+                             'period': 0,
+                             'ended': False,
+                             'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
+                             'date': g['day'],
+                            }
+            else:
+                if team in g['home'] and len(team) == len(g['home']):
+                    game_info = {'home_team': g['home'],
+                                'away_team': g['away'],
+                                'home_score': g['json']['home']['score']['T'],
+                                'away_score': g['json']['away']['score']['T'],
+                                'starting_time': starting_time,
+                                'starting_time_TBD': False,
+                                'clock': g['json']['clock'],
+                                'redzone': g['json']['redzone'],
+                                'posteam': g['json']['posteam'],
+                                'period': g['json']['qtr'],
+                                'ended': (g['json']['qtr'] == 'Final' or g['json']['qtr'] == 'final overtime'),
+                                'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
+                                'date': g['day'],
+                                'firstdowns': g['json']['home']['stats']['team']['totfd'],
+                                'yards': g['json']['home']['stats']['team']['totyds'],
+                                'pyards': g['json']['home']['stats']['team']['pyds'],
+                                'ryards': g['json']['home']['stats']['team']['ryds'],
+                                'flags': g['json']['home']['stats']['team']['pen'],
+                                'flagyds': g['json']['home']['stats']['team']['penyds'],
+                                'trnovrs': g['json']['home']['stats']['team']['trnovr'],
+                                'punts': g['json']['home']['stats']['team']['pt'],
+                                'puntyds': g['json']['home']['stats']['team']['ptyds'],
+                                'puntavg': g['json']['home']['stats']['team']['ptavg'],
+                                'top': g['json']['home']['stats']['team']['top'],
+                                }
+                elif team in g['away'] and len(team) == len(g['away']):
+                    game_info = {'home_team': g['home'],
+                                'away_team': g['away'],
+                                'home_score': g['json']['home']['score']['T'],
+                                'away_score': g['json']['away']['score']['T'],
+                                'starting_time': starting_time,
+                                'starting_time_TBD': False,
+                                'clock': g['json']['clock'],
+                                'redzone': g['json']['redzone'],
+                                'posteam': g['json']['posteam'],
+                                'period': g['json']['qtr'],
+                                'ended': (g['json']['qtr'] == 'Final' or g['json']['qtr'] == 'final overtime'),
+                                'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
+                                'date': g['day'],
+                                'firstdowns': g['json']['away']['stats']['team']['totfd'],
+                                'yards': g['json']['away']['stats']['team']['totyds'],
+                                'pyards': g['json']['away']['stats']['team']['pyds'],
+                                'ryards': g['json']['away']['stats']['team']['ryds'],
+                                'flags': g['json']['away']['stats']['team']['pen'],
+                                'flagyds': g['json']['away']['stats']['team']['penyds'],
+                                'trnovrs': g['json']['away']['stats']['team']['trnovr'],
+                                'punts': g['json']['away']['stats']['team']['pt'],
+                                'puntyds': g['json']['away']['stats']['team']['ptyds'],
+                                'puntavg': g['json']['away']['stats']['team']['ptavg'],
+                                'top': g['json']['away']['stats']['team']['top'],
+                                }
+                else:
+                    pass
+            if team == "--IP":
+                if game_info['clock'] and not game_info['ended'] and game_info['period'] != 'Pregame':
+                    games.append(game_info)
+            elif team == "NOTFINAL":
+                if not game_info['ended']:
+                    games.append(game_info)
+            elif team == 'FINAL':
+                if game_info['ended']:
+                    games.append(game_info)
+            else:
+                games.append(game_info)
+
+        return games
+
+############################
+# Today's games cache
+############################
+    def _cachedData(self, url):
+        """Return the CachedResponse of the URL, or None."""
+        cached = self._today_scores.get(url)
+        if cached is None or cached.last_modified is None:
+            return None
+        return cached
+
+    def _updateCache(self, url, response):
+        """Publish the response's body as the URL's cached data (a single
+        reference assignment; an update racing with this one may be lost,
+        which only costs a download) and return its CachedResponse."""
+        cached = CachedResponse(response.headers['last-modified'],
+                                response.read())
+        scores = dict(self._today_scores)
+        scores[url] = cached
+        self._today_scores = scores
+        return cached
+
+############################
+# Snapshots
+############################
+    def _gameStatus(self, game):
+        if game['ended']:
+            return 'final'
+        elif game['period'] in (0, 'Pregame'):
+            return 'pregame'
+        elif game['period'] == 'Halftime':
+            return 'halftime'
+        return 'live'
+
+
+    def _snapshotGames(self, snapshot, team='', status='', week=''):
+        """Return the games of a snapshot (as returned by _parseGames for
+        'ALL') matching the team, status and week, in the format served by
+        the HTTP callback."""
+        games = []
+        for g in snapshot:
+            game = {k: v for (k, v) in g.items()
+                    if k not in ('week', 'week_number', 'date')}
+            game['week'] = g['week_number']
+            game['status'] = self._gameStatus(g)
+            if team and team not in (g['home_team'], g['away_team']):
+                continue
+            # 'live' covers halftime too, as the 'nfl --IP' filter does.
+            if status and status.lower() not in (game['status'],
+                    'live' if game['status'] == 'halftime' else None):
+                continue
+            if week and week != g['week_number']:
+                continue
+            games.append(game)
+        return games
+
+############################
+# Date-manipulation helpers
+############################
+    def _getTodayDate(self):
+        """Get the current date formatted as "YYYYMMDD".
+        Because the API separates games by day of start, we will consider and
+        return the date in the Pacific timezone.
+        The objective is to avoid reading future games anticipatedly when the
+        day rolls over at midnight, which would cause us to ignore games
+        in progress that may have started on the previous day.
+        Taking the west coast time guarantees that the day will advance only
+        when the whole continental US is already on that day."""
+        today = self._pacificTimeNow().date()
+        today_iso = today.isoformat()
+        return today_iso.replace('-', '')
+
+    def _easternTimeNow(self):
+        return datetime.datetime.now(pytz.timezone('US/Eastern'))
+
+    def _pacificTimeNow(self):
+        return datetime.datetime.now(pytz.timezone('US/Pacific'))
+
+    def _ISODateToEasternTime(self, iso):
+        """Convert the ISO date in UTC time that the API outputs into an
+        Eastern time formatted with am/pm. (The default human-readable format
+        for the listing of games)."""
+        date = dateutil.parser.parse(iso)
+        date_eastern = date.astimezone(pytz.timezone('US/Eastern'))
+        eastern_time = date_eastern.strftime('%-I:%M %p')
+        return "{} ET".format(eastern_time) # Strip the seconds
+
+    def _stripDateSeparators(self, date_string):
+        return date_string.replace('-', '')
+
+    def _EnglishDateToDate(self, date):
+        """Convert a human-readable like 'yesterday' to a datetime object
+        and return a 'YYYYMMDD' string."""
+        if date == "lastweek":
+            day_delta = -7
+        elif date == "yesterday":
+            day_delta = -1
+        elif date == "today" or date =="tonight":
+            day_delta = 0
+        elif date == "tomorrow":
+            day_delta = 1
+        elif date == "nextweek":
+            day_delta = 7
+        # Calculate the day difference and return a string
+        date_string = (self._pacificTimeNow() +
+                      datetime.timedelta(days=day_delta)).strftime('%Y%m%d')
+        return date_string
+
+    def _checkDateInput(self, date):
+        """Verify that the given string is a valid date formatted as
+        YYYY-MM-DD. Also, the API seems to go back until 2014-10-04, so we
+        will check that the input is not a date earlier than that."""
+
+        #weeks = {'pre1':['2016-08-11', '2016-08-14'],
+        #         'pre2':['2016-08-', '2016-08-'],
+        #         'pre3':['2016-08-', '2016-08-'],
+        #         'pre4':['2016-']}
+
+        if date is None:
+            return None
+
+        if date in self._FUZZY_DAYS:
+            date = self._EnglishDateToDate(date)
+        elif date.replace('-','').isdigit():
+            try:
+                parsed_date = datetime.datetime.strptime(date, '%Y-%m-%d')
+            except:
+                raise ValueError('Incorrect date format, should be YYYY-MM-DD')
+
+            # The current API goes back until 2014-10-04. Is it in range?
+            if parsed_date.date() <  datetime.date(2014, 10, 4):
+                raise ValueError('I can only go back until 2014-10-04')
+        else:
+            return None
+
+        return self._stripDateSeparators(date)
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
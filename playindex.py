@@ -0,0 +1,169 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Full-text index of the current season's plays (descriptions, players and
+play types), built incrementally from the game-center documents. It is an
+SQLite FTS5 table, read through a memory map."""
+
+import sqlite3
+import threading
+from collections import namedtuple
+
+Play = namedtuple('Play', 'eid week home away qtr team desc')
+
+# Play types, and how to spot them in a play's description.
+TYPES = [
+    ('touchdown', 'TOUCHDOWN'),
+    ('interception', 'INTERCEPTED'),
+    ('fumble', 'FUMBLES'),
+    ('sack', 'sacked'),
+    ('field goal', 'field goal'),
+    ('extra point', 'extra point'),
+    ('punt', 'punts'),
+    ('kickoff', 'kicks'),
+    ('penalty', 'PENALTY'),
+    ('pass', 'pass'),
+    ('run', 'up the middle'),
+    ('run', 'left end'),
+    ('run', 'right end'),
+    ('run', 'left tackle'),
+    ('run', 'right tackle'),
+    ('run', 'left guard'),
+    ('run', 'right guard'),
+]
+
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def playTypes(desc):
+    return ' '.join(sorted(set(t for (t, marker) in TYPES if marker in desc)))
+
+
+class PlayIndex(object):
+    def __init__(self, filename):
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._lock = threading.Lock()
+        # eid -> set of (drive, play) already indexed, and the last document
+        # indexed for that game.
+        self._seen = {}
+        self._documents = {}
+        self._season = None
+        with self._lock, self._db:
+            self._db.execute('PRAGMA mmap_size={}'.format(MMAP_SIZE))
+            self._db.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS plays USING fts5 (
+                    desc, players, type, team,
+                    season UNINDEXED, week UNINDEXED, eid UNINDEXED,
+                    home UNINDEXED, away UNINDEXED, qtr UNINDEXED
+                );
+                CREATE TABLE IF NOT EXISTS seen (
+                    eid TEXT,
+                    drive TEXT,
+                    play TEXT,
+                    PRIMARY KEY (eid, drive, play)
+                );
+                """)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, eid, season, week, home, away, game):
+        """Index the plays of a game-center document that weren't indexed
+        yet. A newer season replaces the indexed one; games of an older
+        season (eg. backfilled) are ignored."""
+        if self._documents.get(eid) is game:
+            return
+
+        with self._lock:
+            seen = self._seen
+            with self._db:
+                if season != self._season:
+                    # Another process may have indexed a newer season.
+                    (latest,) = self._db.execute(
+                        'SELECT max(season) FROM plays').fetchone()
+                    if latest is not None and season < latest:
+                        return
+                    self._db.execute('DELETE FROM plays WHERE season!=?',
+                                     (season,))
+                    self._db.execute('DELETE FROM seen WHERE eid NOT IN '
+                                     '(SELECT eid FROM plays)')
+                    seen = {}
+                if eid in seen:
+                    indexed = set(seen[eid])
+                else:
+                    indexed = set(self._db.execute(
+                        'SELECT drive, play FROM seen WHERE eid=?', (eid,)))
+
+                for (drive, content) in game.get('drives', {}).items():
+                    if not isinstance(content, dict):
+                        continue  # 'crntdrv'
+                    for (play, p) in content.get('plays', {}).items():
+                        if (drive, play) in indexed or not p.get('desc'):
+                            continue
+                        indexed.add((drive, play))
+                        # The play may have been indexed by another process
+                        # using the same database.
+                        if not self._db.execute(
+                                'INSERT OR IGNORE INTO seen VALUES (?, ?, ?)',
+                                (eid, drive, play)).rowcount:
+                            continue
+                        players = ' '.join(set(
+                            stat.get('playerName') or ''
+                            for stats in (p.get('players') or {}).values()
+                            for stat in stats))
+                        self._db.execute("""INSERT INTO plays VALUES
+                                            (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                         (p['desc'], players,
+                                          playTypes(p['desc']),
+                                          p.get('posteam', ''), season, week,
+                                          eid, home, away, p.get('qtr', '')))
+
+            # Only once the plays are committed: after a rollback, they are
+            # indexed again next time.
+            if seen is not self._seen:
+                self._seen = seen
+                self._season = season
+            seen[eid] = indexed
+            self._documents[eid] = game
+
+    def search(self, words, team=None, week=None, limit=5):
+        """Return the most recent plays (as Play tuples) matching all the
+        words, optionally for a team (in possession or not) and a week."""
+        terms = ['"{}"'.format(w.replace('"', '""')) for w in words]
+        query = ' '.join(terms)
+        conditions = []
+        params = []
+        if team is not None:
+            conditions.append('(home=? OR away=?)')
+            params += [team, team]
+        if week is not None:
+            conditions.append('week=?')
+            params.append(str(week))
+        sql = 'SELECT eid, week, home, away, qtr, team, desc FROM plays'
+        if query:
+            conditions.insert(0, 'plays MATCH ?')
+            params.insert(0, query)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY eid DESC, rowid DESC LIMIT ?'
+        params.append(limit)
+        with self._lock:
+            return [Play(*row) for row in self._db.execute(sql, params)]
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
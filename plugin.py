@@ -18,11 +18,13 @@
 #     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 ###
 
+import supybot.conf as conf
 import supybot.utils as utils
 from supybot.commands import *
 import supybot.plugins as plugins
 import supybot.ircutils as ircutils
 import supybot.callbacks as callbacks
+import supybot.httpserver as httpserver
 try:
     from supybot.i18n import PluginInternationalization
     _ = PluginInternationalization('NFLscores')
@@ -31,61 +33,165 @@ except ImportError:
     # without the i18n module
     _ = lambda x: x
 
+import contextlib
+import cProfile
 import datetime
 import dateutil.parser
+import hashlib
+import io
 import json
+import pstats
 import pytz
-import urllib.request
-import lxml.etree as lxml
+import threading
+import time
+import tracemalloc
+import urllib.parse
 from collections import OrderedDict
 
-
-class NFLScores(callbacks.Plugin):
+from . import leaders
+from . import packing
+from . import pipeline
+from . import standings
+from . import throttle
+from . import timeline
+
+
+class NFLScoresHTTPCallback(httpserver.SupyHTTPServerCallback):
+    """Serves the current scoreboard snapshot as JSON, optionally filtered
+    with the 'team', 'status' (pregame, live, final) and 'week' query
+    parameters. Supports conditional requests through ETag."""
+    name = 'NFLScores'
+    defaultResponse = _("""
+    Scoreboard snapshot of the NFLScores plugin, as JSON.""")
+
+    def doGetOrHead(self, handler, path, write_content):
+        parts = urllib.parse.urlsplit(path)
+        if parts.path not in ('/', '/scores.json'):
+            self._sendError(404, 'Not found.', write_content)
+            return
+
+        query = urllib.parse.parse_qs(parts.query)
+        filters = tuple(query.get(k, [''])[0].upper()
+                        for k in ('team', 'status', 'week'))
+        try:
+            (body, etag) = self._plugin._snapshotAsJSON(*filters)
+        except Exception:
+            self._plugin.log.exception('Could not build the snapshot.')
+            self._sendError(503, 'Scoreboard unavailable.', write_content)
+            return
+
+        cache_control = 'max-age={}'.format(
+            self._plugin.registryValue('web.maxAge'))
+        if self._matches(etag, handler.headers.get('If-None-Match')):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', len(body))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        if write_content:
+            self.write(body)
+
+    def _matches(self, etag, if_none_match):
+        """Return whether the If-None-Match header matches the ETag, with
+        the weak comparison (the W/ prefixes are ignored)."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        def opaque(tag):
+            tag = tag.strip()
+            return tag[2:] if tag.startswith('W/') else tag
+        return opaque(etag) in [opaque(tag)
+                                for tag in if_none_match.split(',')]
+
+    def _sendError(self, code, message, write_content):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', len(body))
+        self.end_headers()
+        if write_content:
+            self.write(body)
+
+
+# How many line sizes (one per reply target length, roughly) the 'nfl' reply
+# is kept packed for in the scoreboard snapshot.
+SNAPSHOT_LIMITS = 8
+
+
+class NFLScores(callbacks.Plugin, pipeline.Pipeline):
     """Get scores from NFL.com."""
     def __init__(self, irc):
         self.__parent = super(NFLScores, self)
         self.__parent.__init__(irc)
-
-        self._SCOREBOARD_ENDPOINT = ('http://www.nfl.com/liveupdate'
-                                     '/scorestrip/ss.xml')
-        #self._SCOREBOARD_ENDPOINT = ('http://www.nfl.com/liveupdate'
-        #                             '/scorestrip/postseason/ss.xml')
-        self._GAME_URL = ('http://www.nfl.com/liveupdate'
-                          '/game-center/{}/{}_gtd.json')
-
-        #self._FUZZY_DAYS = ['yesterday', 'tonight', 'today', 'tomorrow']
-
-        # These two variables store the latest data acquired from the server
-        # and its modification time. It's a one-element cache.
-        # They are used to employ HTTP's 'If-Modified-Since' header and
-        # avoid unnecessary downloads for today's information (which will be
-        # requested all the time to update the scores).
-        self._today_scores_cached_url = None
-        self._today_scores_last_modified_time = None
-        self._today_scores_last_modified_data = None
-        self._today_json_cached_url = None
-        self._today_json_last_modified_time = None
-        self._today_json_last_modified_data = None
+        # Content-getting helpers and stores (see the pipeline module).
+        pipeline.Pipeline.__init__(self, conf.supybot.directories.data())
+
+        # Latest full-week scoreboard (a pipeline.Snapshot), as served by
+        # the HTTP callback. It is replaced as a whole, so readers don't
+        # lock; the lock only keeps refreshes from piling up. Only its
+        # serialized (and filtered) bodies are added afterwards, under
+        # their own lock.
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self._bodies_lock = threading.Lock()
+
+        # Token buckets and recent replies, for 'nfl' and 'nflgamestats'.
+        self._throttle = throttle.Throttle()
+
+        # Number of upcoming command invocations to profile ('nflprofile'),
+        # and the summary of the last profiled one.
+        self._profile_remaining = 0
+        self._profile_memory = False
+        self._profile_last = None
+        self._profile_lock = threading.Lock()
+
+        self._http_running = False
+        # (Registry callbacks are removed by identity, so keep the bound
+        # method around for die().)
+        self._http_conf_callback = self._doHttpConf
+        conf.supybot.plugins.NFLScores.web.enable.addCallback(
+            self._http_conf_callback)
+        if self.registryValue('web.enable'):
+            self._startHttp()
+
+    def die(self):
+        conf.supybot.plugins.NFLScores.web.enable.removeCallback(
+            self._http_conf_callback)
+        if self._http_running:
+            self._stopHttp()
+        self.close()
+        self.__parent.die()
 
     def nfl(self, irc, msg, args, optional_team): # optional_team, optional_date):
         """
         Get games for the current week, optionally filter by team.
         """
 
-        if optional_team is None:
-            team = "ALL"
-            irc.reply(self._getTodayGames(team))
-        elif optional_team == '*':
-            nf = self._getTodayGames('NOTFINAL')
-            f = self._getTodayGames('FINAL')
-            print(len(nf),len(f))
-            if nf != 'No games found':
-                irc.reply(nf)
-            if f != 'No games found':
-                irc.reply(f)
-        else:
-            team = optional_team.upper()
-            irc.reply(self._getTodayGames(team))
+        request = ('nfl', optional_team and optional_team.upper())
+        if self._throttled(irc, msg, request):
+            return
+
+        with self._profiling('nfl'):
+            limit = self._lineBytes(irc, msg)
+            if optional_team is None:
+                team = "ALL"
+                replies = self._getTodayGames(team, limit)
+            elif optional_team == '*':
+                nf = self._getTodayGames('NOTFINAL', limit)
+                f = self._getTodayGames('FINAL', limit)
+                replies = [r for r in nf + f if r != 'No games found']
+            else:
+                team = optional_team.upper()
+                replies = self._getTodayGames(team, limit)
+            self._reply(irc, msg, request, replies)
 
     nfl = wrap(nfl, [optional('somethingWithoutSpaces')])
 
@@ -95,455 +201,385 @@ class NFLScores(callbacks.Plugin):
         """
 
         team = team.upper()
-        irc.reply(self._getTodayGamesStats(team))
+        request = ('nflgamestats', team)
+        if self._throttled(irc, msg, request):
+            return
+
+        with self._profiling('nflgamestats'):
+            self._reply(irc, msg, request, self._getTodayGamesStats(
+                team, self._lineBytes(irc, msg)))
 
     nflgamestats = wrap(nflgamestats, [('somethingWithoutSpaces')])
 
-    def _getTodayGames(self, team):
+    def nflleaders(self, irc, msg, args, category, team):
+        """<passing|rushing|receiving|sacks> [<team>]
+        Get this week's stat leaders for the given category, optionally
+        for a single team.
+        """
+        # Refreshes the game documents (and thus the leader tables) only
+        # if the scoreboard snapshot is stale.
+        self._currentSnapshot()
+        entries = self._leaders.get(category, team.upper() if team else None)
+        if not entries:
+            irc.reply('No stats found')
+            return
+        title = '{} leaders:'.format(category.capitalize())
+        irc.reply('{} {}'.format(
+            ircutils.bold(ircutils.mircColor(title, 'red')),
+            ' | '.join('{} ({}) {}'.format(ircutils.bold(name), club, detail)
+                       for (_value, name, club, detail) in entries)))
+
+    nflleaders = wrap(nflleaders, [('literal', sorted(leaders.CATEGORIES)),
+                                   optional('somethingWithoutSpaces')])
+
+    def nflat(self, irc, msg, args, team, when):
+        """<team> <q1|q2|half|q3|q4|ot|end|<date and time>>
+        Get the score of the team's game at the end of the given period, or
+        at the given time (Eastern, eg. 2026-10-12T21:00), as seen by the
+        bot.
+        """
+        team = team.upper()
+        period = when.lower()
+        if period in timeline.PERIODS or period == 'end':
+            game = self._timeline.latestGame(team)
+            state = game and self._timeline.atPeriod(game[0], period)
+        else:
+            try:
+                date = dateutil.parser.parse(when)
+            except (ValueError, OverflowError):
+                irc.errorInvalid(_('period or time'), when)
+            if date.tzinfo is None:
+                date = pytz.timezone('US/Eastern').localize(date)
+            game = self._timeline.latestGame(
+                team, date.astimezone(pytz.timezone('US/Eastern'))
+                          .strftime('%Y%m%d99'))
+            state = game and self._timeline.at(game[0], date.timestamp())
+
+        if game is None:
+            irc.reply('No games found')
+        elif state is None:
+            irc.reply('No game state recorded for {} at {}'.format(team, when))
+        else:
+            irc.reply(self._stateToString(game[1], game[2], state))
+
+    nflat = wrap(nflat, ['somethingWithoutSpaces', 'text'])
+
+    def nflsearch(self, irc, msg, args, words):
+        """<words> [<team>] [week <number>]
+        Search this season's plays seen by the bot, eg. "Mahomes touchdown"
+        or "KC interception week 5". Teams must be given in uppercase.
+        """
+        words = ' '.join(words).split()
+        team = week = None
+        terms = []
+        while words:
+            word = words.pop(0)
+            if word.lower() == 'week' and words and words[0].isdigit():
+                week = int(words.pop(0))
+            elif word in standings.TEAMS or word in standings.ALIASES:
+                team = word
+            else:
+                terms.append(word)
+        if not terms and team is None and week is None:
+            irc.error(_('Nothing to search for.'), Raise=True)
+
+        plays = self._plays.search(terms, team, week)
+        if not plays:
+            irc.reply('No plays found')
+            return
+        irc.reply(' | '.join(
+            '{} {} {}'.format(
+                ircutils.bold('Wk{} {}@{}'.format(p.week, p.away, p.home)),
+                ircutils.mircColor('Q{}'.format(p.qtr), 'green'), p.desc)
+            for p in plays))
+
+    nflsearch = wrap(nflsearch, [many('something')])
+
+    def nflstandings(self, irc, msg, args, name):
+        """[<conference> [<division>]]
+        Get the standings of a division (eg. AFC West), or the playoff
+        picture of a conference (or of both).
+        """
+        # Picks up the games that just went final, if the snapshot is stale.
+        self._currentSnapshot()
+        name = (name or '').upper()
+        divisions = dict((d.upper(), d) for d in standings.DIVISIONS)
+        if name in divisions:
+            division = divisions[name]
+            irc.reply('{} {}'.format(
+                ircutils.bold(ircutils.mircColor(division + ':', 'red')),
+                ' | '.join(self._recordToString(team, details=True)
+                           for team in self._standings.division(division))))
+        elif name in ('AFC', 'NFC', ''):
+            for conference in ((name,) if name else ('AFC', 'NFC')):
+                irc.reply('{} {}'.format(
+                    ircutils.bold(ircutils.mircColor(conference + ':',
+                                                     'red')),
+                    ' | '.join('{}. {}'.format(seed,
+                                               self._recordToString(team))
+                               for (seed, team) in enumerate(
+                                   self._standings.playoffs(conference), 1))))
+        else:
+            irc.errorInvalid(_('conference or division'), name)
+
+    nflstandings = wrap(nflstandings, [additional('text')])
+
+    def nflprofile(self, irc, msg, args, opts, count):
+        """[--memory] [<count>]
+        Profile the next <count> invocations of nfl/nflgamestats with
+        cProfile (and tracemalloc, if --memory is given). The reports are
+        written to the bot's data directory. Without <count>, show the
+        profiling status and the summary of the last profiled command.
+        """
+        if count is None:
+            irc.reply(utils.str.format(
+                '%n left to profile. Last: %s. Parse cache: %n, %n, %n.',
+                (self._profile_remaining, 'invocation'),
+                self._profile_last or 'none',
+                *zip(self._parse_cache.stats(), ('hit', 'miss', 'entry'))))
+            return
+        with self._profile_lock:
+            self._profile_remaining = count
+            self._profile_memory = ('memory', True) in opts
+        irc.replySuccess()
+
+    nflprofile = wrap(nflprofile, ['owner', getopts({'memory': ''}),
+                                   optional('positiveInt')])
+
+    def _getTodayGames(self, team, limit):
         games = self._getGames(team, self._getTodayDate())
-        return self._resultAsString(games, team)
+        if team == 'ALL':
+            return self._updateSnapshot(games, limit).lines[limit]
+        return self._resultAsLines(games, team, limit)
 
-    def _getTodayGamesStats(self, team):
+    def _getTodayGamesStats(self, team, limit):
         games = self._getGameStats(team, self._getTodayDate())
-        return self._statsAsString(games, team)
+        return self._statsAsLines(games, team, limit)
 
     def _getGamesForDate(self, team, date):
         games = self._getGames(team, date)
         return self._resultAsString(games)
 
 ############################
-# Content-getting helpers
+# Throttling
 ############################
-    def _getGames(self, team, date):
-        """Given a date, populate the url with it and try to download its
-        content. If successful, parse the JSON data and extract the relevant
-        fields for each game. Returns a list of games."""
-        sched_url = self._SCOREBOARD_ENDPOINT
-        base_games_url = self._GAME_URL
-
-        # (If asking for today's results, enable the 'If-Mod.-Since' flag)
-        use_cache = (date == self._getTodayDate())
-        response = self._getURL(sched_url, use_cache)
-        games = self._getGamesSch(response, team)
-        print(games)
-        games = self._getGamesJson(base_games_url, games, use_cache)
-        games = self._parseGames(games, team)
-
-        return games
-
-    def _getGameStats(self, team, date):
-        """Given a date, populate the url with it and try to download its
-        content. If successful, parse the JSON data and extract the relevant
-        fields for each game. Returns a list of games."""
-        sched_url = self._SCOREBOARD_ENDPOINT
-        base_games_url = self._GAME_URL
-
-        # (If asking for today's results, enable the 'If-Mod.-Since' flag)
-        use_cache = (date == self._getTodayDate())
-        response = self._getURL(sched_url, use_cache)
-        games = self._getGamesSch(response, team)
-        #print(games)
-        games = self._getGamesJson(base_games_url, games, use_cache)
-        games = self._parseStats(games, team)
-
-        return games
-
-    def _getGamesJson(self, url, data, use_cache):
-        """This is a kludgy mess to find out if there is json data associated
-        with a given game."""
-
-        for game in data:
-            url2 = url.format(game['eid'], game['eid'])
-            try:
-                response = self._getURL(url2, use_cache)
-                json = self._extractJSON(response)
-                game['json'] = json[game['eid']]
-            except:
-                game['json'] = None
-
-        return data
-
-    def _getGamesSch(self, data, team):
-        xml = lxml.fromstring(data)
-        games = []
-        for g in xml.xpath("//g"):
-            # For a specific team, only parse out that team
-            if team in g.get('h') or team in g.get('v'):
-                gsis_id = g.get('eid')
-                games.append({
-                    'eid': gsis_id,
-                    'wday': g.get('d'),
-                    'year': xml.find("gms").get('y'),
-                    'month': int(gsis_id[4:6]),
-                    'day': int(gsis_id[6:8]),
-                    'time': g.get('t'),
-                    'meridiem': None,
-                    'season_type': g.get('gt'),
-                    'week': None,
-                    'home': g.get('h'),
-                    'away': g.get('v'),
-                    'gamekey': g.get('gsis'),
-                })
-            # For every team, or and for games in progress
-            elif team == 'ALL' or team == '--IP':
-                gsis_id = g.get('eid')
-                games.append({
-                    'eid': gsis_id,
-                    'wday': g.get('d'),
-                    'year': xml.find("gms").get('y'),
-                    'month': int(gsis_id[4:6]),
-                    'day': int(gsis_id[6:8]),
-                    'time': g.get('t'),
-                    'meridiem': None,
-                    'season_type': g.get('gt'),
-                    'week': xml.find("gms").get('w'),
-                    'home': g.get('h'),
-                    'away': g.get('v'),
-                    'gamekey': g.get('gsis'),
-                })
-            # For games just today
-            elif team == 'TODAY':
-                gsis_id = g.get('eid')
-                tdate = datetime.datetime.now().day
-                if tdate == int(gsis_id[6:8]):
-                    games.append({
-                        'eid': gsis_id,
-                        'wday': g.get('d'),
-                        'year': xml.find("gms").get('y'),
-                        'month': int(gsis_id[4:6]),
-                        'day': int(gsis_id[6:8]),
-                        'time': g.get('t'),
-                        'meridiem': None,
-                        'season_type': g.get('gt'),
-                        'week': None,
-                        'home': g.get('h'),
-                        'away': g.get('v'),
-                        'gamekey': g.get('gsis'),
-                    })
-            # For games just tomorrow
-            elif team == 'TOMORROW':
-                gsis_id = g.get('eid')
-                tdate = datetime.datetime.now().day + 1
-                if tdate == int(gsis_id[6:8]):
-                    games.append({
-                        'eid': gsis_id,
-                        'wday': g.get('d'),
-                        'year': xml.find("gms").get('y'),
-                        'month': int(gsis_id[4:6]),
-                        'day': int(gsis_id[6:8]),
-                        'time': g.get('t'),
-                        'meridiem': None,
-                        'season_type': g.get('gt'),
-                        'week': None,
-                        'home': g.get('h'),
-                        'away': g.get('v'),
-                        'gamekey': g.get('gsis'),
-                    })
-            # For games just yesterday
-            elif team == 'YESTERDAY':
-                gsis_id = g.get('eid')
-                tdate = datetime.datetime.now().day - 1
-                if tdate == int(gsis_id[6:8]):
-                    games.append({
-                        'eid': gsis_id,
-                        'wday': g.get('d'),
-                        'year': xml.find("gms").get('y'),
-                        'month': int(gsis_id[4:6]),
-                        'day': int(gsis_id[6:8]),
-                        'time': g.get('t'),
-                        'meridiem': None,
-                        'season_type': g.get('gt'),
-                        'week': None,
-                        'home': g.get('h'),
-                        'away': g.get('v'),
-                        'gamekey': g.get('gsis'),
-                    })
-
-            # This runs for the '*' argument
-            elif 'FINAL' in team:
-                gsis_id = g.get('eid')
-                games.append({
-                    'eid': gsis_id,
-                    'wday': g.get('d'),
-                    'year': xml.find("gms").get('y'),
-                    'month': int(gsis_id[4:6]),
-                    'day': int(gsis_id[6:8]),
-                    'time': g.get('t'),
-                    'meridiem': None,
-                    'season_type': g.get('gt'),
-                    'week': xml.find("gms").get('w'),
-                    'home': g.get('h'),
-                    'away': g.get('v'),
-                    'gamekey': g.get('gsis'),
-                })
-
-        for game in games:
-            h = int(game['time'].split(':')[0])
-            print(h)
-            m = int(game['time'].split(':')[1])
-            if 0 < h <= 12:  # All games before "9:00" are PM until proven otherwise
-                game['meridiem'] = 'PM'
-
-            if game['meridiem'] is None:
-
-                days_games = [g for g in games if g['wday'] == game['wday']]
-                preceeding = [g for g in days_games if g['eid'] < game['eid']]
-                proceeding = [g for g in days_games if g['eid'] > game['eid']]
-
-                #print(days_games, preceeding, proceeding)
-                # for g in proceeding:
-                #     print(g)
-
-                # If any games *after* this one are AM then so is this
-                if any(g['meridiem'] == 'AM' for g in proceeding):
-                    game['meridiem'] = 'AM'
-                # If any games *before* this one are PM then so is this one
-                elif any(g['meridiem'] == 'PM' for g in preceeding):
-                    game['meridiem'] = 'PM'
-                # If any games *after* this one have an "earlier" start it's AM
-                elif any(h > t for t in [int(g['time'].split(':')[0]) for g in proceeding]):
-                    game['meridiem'] = 'AM'
-                # If any games *before* this one have a "later" start time it's PM
-                elif any(h < t for t in [int(g['time'].split(':')[0]) for g in preceeding]):
-                    game['meridiem'] = 'PM'
-
-            if game['meridiem'] is None:
-                if game['wday'] not in ['Sat', 'Sun']:
-                    game['meridiem'] = 'PM'
-                if game['season_type'] == 'POST':
-                    game['meridiem'] = 'PM'
-
-        return games
-
-    def _getURL(self, url, use_cache=False):
-        """Use urllib to download the URL's content. The use_cache flag enables
-        the use of the one-element cache, which will be reserved for today's
-        games URL. (In the future we could implement a real cache with TTLs)."""
-        user_agent = 'Mozilla/5.0 \
-                      (X11; Ubuntu; Linux x86_64; rv:45.0) \
-                      Gecko/20100101 Firefox/45.0'
-        header = {'User-Agent': user_agent}
-
-        # ('If-Modified-Since' to avoid unnecessary downloads.)
-        if use_cache and self._haveCachedData(url):
-            header['If-Modified-Since'] = self._today_scores_last_modified_time
-
-        request = urllib.request.Request(url, headers=header)
-
+    def _throttled(self, irc, msg, request):
+        """Check the request against the per-user and per-channel limits.
+        If it may not run, answer it with the last reply to the same request
+        (or a short notice) and return True."""
+        if not self.registryValue('throttle.enable'):
+            return False
+        channel = msg.channel and (irc.network, msg.channel)
+        user_limits = (self.registryValue('throttle.user.burst'),
+                       self.registryValue('throttle.user.period'))
+        channel_limits = (self.registryValue('throttle.channel.burst'),
+                          self.registryValue('throttle.channel.period'))
+        if self._throttle.allow((irc.network, msg.host), channel,
+                                user_limits, channel_limits):
+            return False
+
+        target = (irc.network, msg.channel or msg.nick)
+        cached = self._throttle.recall(
+            request, self.registryValue('throttle.replyMaxAge'))
+        if cached is None:
+            irc.reply(_('Too many requests, try again in a bit.'),
+                      private=True, notice=True)
+        elif target in cached[1]:
+            # The reply is right there in the backlog.
+            irc.reply(_('Unchanged since {}s ago.').format(int(cached[0])),
+                      private=True, notice=True)
+        else:
+            # The lines were packed for the first target, whose overhead
+            # may be smaller.
+            for reply in packing.refit(cached[2], self._lineBytes(irc, msg)):
+                irc.reply(reply)
+            self._throttle.replayed(request, target)
+        return True
+
+    def _lineBytes(self, irc, msg):
+        """Return how many bytes of text fit in a reply to the message: the
+        server's line length minus what Limnoria and the server add."""
         try:
-            response = urllib.request.urlopen(request, timeout=2)
-        except urllib.error.HTTPError as error:
-            if use_cache and error.code == 304: # Cache hit
-                self.log.info("{} - 304"
-                              "(Last-Modified: "
-                              "{})".format(url, self._cachedDataLastModified()))
-                return self._cachedData()
-            else:
-                self.log.error("HTTP Error ({}): {}".format(url, error.code))
-                pass
-
-        self.log.info("{} - 200".format(url))
-
-        if not use_cache:
-            return response.read()
-
-        # Updating the cached data:
-        self._updateCache(url, response)
-        return self._cachedData()
-
-    def _extractJSON(self, body):
-        return json.loads(body.decode('utf-8'))
-
-    def _parseGames(self, data, team):
-        """Extract all relevant fields from NFL.com's scoreboard.json
-        and return a list of games."""
-        games = []
-        for g in data:
-
-            # Starting times are in UTC. By default, we will show Eastern times.
-            # (In the future we could add a user option to select timezones.)
-            # starting_time = '{} {}{}'.format(g['wday'], g['time'], g['meridiem'])
-            starting_time = '{} {}'.format(g['wday'], g['time'])
-            if not g['json']:
-                game_info = {'home_team': g['home'],
-                             'away_team': g['away'],
-                             'starting_time': starting_time,
-                             'starting_time_TBD': False,
-                             'clock': None,
-                             'period': 0,
-                             'ended': False,
-                             'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
-                             'date': g['day'],
-                            }
-            else:
-                # First see if there's a last play in the json
-                try:
-                    mp = 0
-                    for p,v in g['json']['drives'][str(g['json']['drives']['crntdrv'])]['plays'].items():
-                        if int(p) > mp:
-                            mp = int(p)
-                    try:
-                        lp = g['json']['drives'][str(g['json']['drives']['crntdrv'])]['plays'][str(mp)]['desc']
-                    except:
-                        lp = ''
-                except:
-                    lp = ''
-                game_info = {'home_team': g['home'],
-                             'away_team': g['away'],
-                             'home_score': g['json']['home']['score']['T'],
-                             'away_score': g['json']['away']['score']['T'],
-                             'starting_time': starting_time,
-                             'starting_time_TBD': False,
-                             'clock': g['json']['clock'],
-                             'period': g['json']['qtr'],
-                             'redzone': g['json']['redzone'],
-                             'posteam': g['json']['posteam'],
-                             'yardline': g['json']['yl'],
-                             'down': ('1' if g['json']['down'] is None else g['json']['down']),
-                             'togo': ('' if g['json']['togo'] == 0 else g['json']['togo']),
-                             'lastplay': lp,
-                             'ended': (g['json']['qtr'] == 'Final' or g['json']['qtr'] == 'final overtime'),
-                             'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
-                             'date': g['day'],
-                            }
-            if team == "--IP":
-                if game_info['clock'] and not game_info['ended'] and game_info['period'] != 'Pregame':
-                    games.append(game_info)
-            elif team == "NOTFINAL":
-                if not game_info['ended']:
-                    games.append(game_info)
-            elif team == 'FINAL':
-                if game_info['ended']:
-                    games.append(game_info)
-            else:
-                games.append(game_info)
-
-        return games
-
-    def _parseStats(self, data, team):
-        """Extract all relevant fields from NFL.com's scoreboard.json
-        and return a list of games."""
-        games = []
-        for g in data:
-            #print(g['home'], g['away'], team)
-            # Starting times are in UTC. By default, we will show Eastern times.
-            # (In the future we could add a user option to select timezones.)
-            # starting_time = '{} {}{}'.format(g['wday'], g['time'], g['meridiem'])
-            starting_time = '{} {}'.format(g['wday'], g['time'])
-            if not g['json']:
-                game_info = {'home_team': g['home'],
-                             'away_team': g['away'],
-                             'starting_time': starting_time,
-                             'starting_time_TBD': False,
-                             'clock': None,
-                             'period': 0,
-                             'ended': False,
-                             'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
-                             'date': g['day'],
-                            }
-            else:
-                if team in g['home'] and len(team) == len(g['home']):
-                    game_info = {'home_team': g['home'],
-                                'away_team': g['away'],
-                                'home_score': g['json']['home']['score']['T'],
-                                'away_score': g['json']['away']['score']['T'],
-                                'starting_time': starting_time,
-                                'starting_time_TBD': False,
-                                'clock': g['json']['clock'],
-                                'redzone': g['json']['redzone'],
-                                'posteam': g['json']['posteam'],
-                                'period': g['json']['qtr'],
-                                'ended': (g['json']['qtr'] == 'Final' or g['json']['qtr'] == 'final overtime'),
-                                'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
-                                'date': g['day'],
-                                'firstdowns': g['json']['home']['stats']['team']['totfd'],
-                                'yards': g['json']['home']['stats']['team']['totyds'],
-                                'pyards': g['json']['home']['stats']['team']['pyds'],
-                                'ryards': g['json']['home']['stats']['team']['ryds'],
-                                'flags': g['json']['home']['stats']['team']['pen'],
-                                'flagyds': g['json']['home']['stats']['team']['penyds'],
-                                'trnovrs': g['json']['home']['stats']['team']['trnovr'],
-                                'punts': g['json']['home']['stats']['team']['pt'],
-                                'puntyds': g['json']['home']['stats']['team']['ptyds'],
-                                'puntavg': g['json']['home']['stats']['team']['ptavg'],
-                                'top': g['json']['home']['stats']['team']['top'],
-                                }
-                elif team in g['away'] and len(team) == len(g['away']):
-                    game_info = {'home_team': g['home'],
-                                'away_team': g['away'],
-                                'home_score': g['json']['home']['score']['T'],
-                                'away_score': g['json']['away']['score']['T'],
-                                'starting_time': starting_time,
-                                'starting_time_TBD': False,
-                                'clock': g['json']['clock'],
-                                'redzone': g['json']['redzone'],
-                                'posteam': g['json']['posteam'],
-                                'period': g['json']['qtr'],
-                                'ended': (g['json']['qtr'] == 'Final' or g['json']['qtr'] == 'final overtime'),
-                                'week': ('Week ' + g['week'] + ': ' if g['week'] else ''),
-                                'date': g['day'],
-                                'firstdowns': g['json']['away']['stats']['team']['totfd'],
-                                'yards': g['json']['away']['stats']['team']['totyds'],
-                                'pyards': g['json']['away']['stats']['team']['pyds'],
-                                'ryards': g['json']['away']['stats']['team']['ryds'],
-                                'flags': g['json']['away']['stats']['team']['pen'],
-                                'flagyds': g['json']['away']['stats']['team']['penyds'],
-                                'trnovrs': g['json']['away']['stats']['team']['trnovr'],
-                                'punts': g['json']['away']['stats']['team']['pt'],
-                                'puntyds': g['json']['away']['stats']['team']['ptyds'],
-                                'puntavg': g['json']['away']['stats']['team']['ptavg'],
-                                'top': g['json']['away']['stats']['team']['top'],
-                                }
-                else:
-                    pass
-            if team == "--IP":
-                if game_info['clock'] and not game_info['ended'] and game_info['period'] != 'Pregame':
-                    games.append(game_info)
-            elif team == "NOTFINAL":
-                if not game_info['ended']:
-                    games.append(game_info)
-            elif team == 'FINAL':
-                if game_info['ended']:
-                    games.append(game_info)
-            else:
-                games.append(game_info)
-
-        return games
+            overhead = irc._replyOverhead(msg)
+        except AttributeError: # Limnoria before 2021.
+            overhead = len(':{} PRIVMSG {} :{}: \r\n'.format(
+                irc.prefix, msg.channel or msg.nick, msg.nick))
+        return self.registryValue('lineBytes') - overhead
+
+    def _reply(self, irc, msg, request, replies):
+        self._throttle.remember(request, (irc.network,
+                                          msg.channel or msg.nick), replies)
+        for reply in replies:
+            irc.reply(reply)
 
 ############################
-# Today's games cache
+# Profiling
 ############################
-    def _cachedData(self):
-        return self._today_scores_last_modified_data
-
-    def _haveCachedData(self, url):
-        return (self._today_scores_cached_url == url) and \
-                (self._today_scores_last_modified_time is not None)
-
-    def _cachedDataLastModified(self):
-        return self._today_scores_last_modified_time
+    @contextlib.contextmanager
+    def _profiling(self, name):
+        """Profile the wrapped block if 'nflprofile' asked for it. The
+        pstats dump and a text report (plus the top allocation sites when
+        tracing memory) are written to the data directory."""
+        with self._profile_lock:
+            sample = self._profile_remaining > 0
+            if sample:
+                self._profile_remaining -= 1
+            memory = sample and self._profile_memory \
+                     and not tracemalloc.is_tracing()
+
+        if not sample:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        if memory:
+            tracemalloc.start()
+        start = time.time()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.time() - start
+            if memory:
+                allocations = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self._writeProfile(name, profiler, elapsed,
+                               allocations if memory else None,
+                               peak if memory else None)
+
+    def _writeProfile(self, name, profiler, elapsed, allocations, peak):
+        filename = conf.supybot.directories.data.dirize(
+            'NFLScores-profile-{}-{}'.format(
+                name, time.strftime('%Y%m%d%H%M%S')))
+        profiler.dump_stats(filename + '.prof')
+
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        stats.sort_stats('cumulative').print_stats(40)
+        if allocations is not None:
+            report.write('Top allocation sites:\n')
+            for stat in allocations.statistics('lineno')[:20]:
+                report.write('{}\n'.format(stat))
+        with open(filename + '.txt', 'w') as fd:
+            fd.write(report.getvalue())
+
+        # Functions with the most time spent in themselves.
+        top = sorted(stats.stats.items(), key=lambda i: i[1][2],
+                     reverse=True)[:3]
+        summary = '{}: {:.3f}s ({}){} -> {}.txt'.format(
+            name, elapsed,
+            ', '.join('{} {:.3f}s'.format(func, tt)
+                      for ((_file, _line, func), (_cc, _nc, tt, _ct, _c))
+                      in top),
+            ', peak {}'.format(utils.str.format('%S', peak))
+                if peak is not None else '',
+            filename)
+        self.log.info('Profiled %s', summary)
+        self._profile_last = summary
 
-    def _updateCache(self, url, response):
-        self._today_scores_cached_url = url
-        self._today_scores_last_modified_time = response.headers['last-modified']
-        self._today_scores_last_modified_data = response.read()
+############################
+# Scoreboard snapshot (HTTP)
+############################
+    def _doHttpConf(self, *args, **kwargs):
+        if self.registryValue('web.enable'):
+            if not self._http_running:
+                self._startHttp()
+        else:
+            if self._http_running:
+                self._stopHttp()
+
+    def _startHttp(self):
+        callback = NFLScoresHTTPCallback()
+        callback._plugin = self
+        httpserver.hook('nflscores', callback)
+        self._http_running = True
+
+    def _stopHttp(self):
+        httpserver.unhook('nflscores')
+        self._http_running = False
+
+    def _updateSnapshot(self, games, limit=None):
+        """Publish a copy of the full week's parsed games (the formatting
+        helpers modify the game dicts in place) as the new snapshot, with
+        the 'nfl' reply packed for `limit` and the line sizes of the
+        previous snapshot (the most recent SNAPSHOT_LIMITS of them). If
+        the games didn't change, the previous lines are reused."""
+        games = tuple(dict(g) for g in games)
+        previous = self._snapshot
+        limits = []
+        if previous is not None:
+            limits = [l for l in previous.lines if l != limit]
+        if limit is not None:
+            limits.append(limit)
+        reuse = previous is not None and previous.games == games
+        lines = {}
+        for l in limits[-SNAPSHOT_LIMITS:]:
+            if reuse and l in previous.lines:
+                lines[l] = previous.lines[l]
+            else:
+                lines[l] = self._resultAsLines([dict(g) for g in games],
+                                               'ALL', l)
+        snapshot = pipeline.Snapshot(games, time.time(), lines, {})
+        self._snapshot = snapshot
+        return snapshot
+
+    def _currentSnapshot(self):
+        """Return the latest snapshot, refreshing it from NFL.com only when
+        it is older than web.maxAge. Concurrent requests don't pile up on
+        the refresh: they are served the stale copy in the meantime."""
+        max_age = self.registryValue('web.maxAge')
+        snapshot = self._snapshot
+        if snapshot is None or time.time() - snapshot.time > max_age:
+            if self._snapshot_lock.acquire(snapshot is None):
+                try:
+                    snapshot = self._snapshot
+                    if snapshot is None or \
+                            time.time() - snapshot.time > max_age:
+                        snapshot = self._updateSnapshot(
+                            self._getGames('ALL', self._getTodayDate()))
+                finally:
+                    self._snapshot_lock.release()
+        return snapshot
+
+    def _snapshotAsJSON(self, team='', status='', week=''):
+        """Serialize the current snapshot (filtered by team, status and week)
+        and return the body along with its ETag."""
+        snapshot = self._currentSnapshot()
+        key = (team, status, week)
+        with self._bodies_lock:
+            if key in snapshot.bodies:
+                return snapshot.bodies[key]
+
+        games = self._snapshotGames(snapshot.games, team, status, week)
+        body = json.dumps({'updated': int(snapshot.time), 'games': games},
+                          sort_keys=True).encode('utf-8')
+        # The ETag only depends on the games, so that refreshes which didn't
+        # change anything still get 304s. (It is weak, since 'updated' does
+        # change.)
+        etag = 'W/"{}"'.format(hashlib.sha1(
+            json.dumps(games, sort_keys=True).encode('utf-8')).hexdigest())
+        with self._bodies_lock:
+            return snapshot.bodies.setdefault(key, (body, etag))
 
 ############################
 # Formatting helpers
 ############################
-    def _statsAsString(self, games, team=None):
+    def _statsAsLines(self, games, team, limit):
         if len(games) == 0:
-            return "No games found"
+            return ["No games found"]
         else:
             s = sorted(games, key=lambda k: k['ended']) #, reverse=True)
             b = []
             for g in s:
-                b.append(self._statToString(g, team))
-            return "{} {}".format(ircutils.bold(ircutils.mircColor(team + ' Game Stats:', 'red')), ' | '.join(b))
+                b.extend(self._statToStrings(g, team))
+            return packing.pack(b, limit, "{} ".format(ircutils.bold(ircutils.mircColor(team + ' Game Stats:', 'red'))))
 
-    def _statToString(self, game, team=None):
-        """ Given a game, format the information into a string according to the
-        context. For example:
+    def _statToStrings(self, game, team=None):
+        """ Given a game, format the information into strings according to
+        the context: the score, then each stat (so that a long line of stats
+        can be packed over several lines). For example:
         "MEM @ CLE 07:00 PM ET" (a game that has not started yet),
         "HOU 132 GSW 127 F OT2" (a game that ended and went to 2 overtimes),
         "POR 36 LAC 42 8:01 Q2" (a game in progress)."""
@@ -565,7 +601,7 @@ class NFLScores(callbacks.Plugin):
             starting_time = game['starting_time'] \
                             if not game['starting_time_TBD'] \
                             else "TBD"
-            return "{} @ {} {}".format(away_team, home_team, starting_time)
+            return ["{} @ {} {}".format(away_team, home_team, starting_time)]
 
         # The game started => It has points:
         away_score = game['away_score']
@@ -593,16 +629,17 @@ class NFLScores(callbacks.Plugin):
                                                                 game['ended']))
         # Add stats
         if team != "ALL" and team != '--IP' and game['period'] != 9: # and not game['ended'] and 'FINAL' not in team:
-            if len(team) <= 3:                 #  fd      ty       py      ry      flags           tos      punts          top
-                game_string = game_string + " :: {} {} | {} {} | {} {} | {} {} | {} {} ({} yds) | {} {} | {} {} ({} avg) | {} {}".format(ircutils.bold('First Downs:'), game['firstdowns'],
-                                                                                                                                           ircutils.bold('Total Yards:'), game['yards'],
-                                                                                                                                           ircutils.bold('Passing Yards:'), game['pyards'],
-                                                                                                                                           ircutils.bold('Rushing Yards:'), game['ryards'],
-                                                                                                                                           ircutils.bold('Flags:'), game['flags'], game['flagyds'],
-                                                                                                                                           ircutils.bold('Turnovers:'), game['trnovrs'],
-                                                                                                                                           ircutils.bold('Punts:'), game['punts'], game['puntavg'],
-                                                                                                                                           ircutils.bold('Time of Poss.:'), game['top'])
-        return game_string
+            if len(team) <= 3:
+                stats = ["{} {}".format(ircutils.bold('First Downs:'), game['firstdowns']),
+                         "{} {}".format(ircutils.bold('Total Yards:'), game['yards']),
+                         "{} {}".format(ircutils.bold('Passing Yards:'), game['pyards']),
+                         "{} {}".format(ircutils.bold('Rushing Yards:'), game['ryards']),
+                         "{} {} ({} yds)".format(ircutils.bold('Flags:'), game['flags'], game['flagyds']),
+                         "{} {}".format(ircutils.bold('Turnovers:'), game['trnovrs']),
+                         "{} {} ({} avg)".format(ircutils.bold('Punts:'), game['punts'], game['puntavg']),
+                         "{} {}".format(ircutils.bold('Time of Poss.:'), game['top'])]
+                return ["{} :: {}".format(game_string, stats[0])] + stats[1:]
+        return [game_string]
 
     def _resultAsString(self, games, team=None):
         if len(games) == 0:
@@ -614,6 +651,17 @@ class NFLScores(callbacks.Plugin):
                 b.append(self._gameToString(g, team))
             return "{}{}".format(ircutils.bold(games[0]['week']), ' | '.join(b))
 
+    def _resultAsLines(self, games, team, limit):
+        """Same as _resultAsString, packed into lines of `limit` bytes."""
+        if len(games) == 0:
+            return ["No games found"]
+        else:
+            s = sorted(games, key=lambda k: k['ended']) #, reverse=True)
+            b = []
+            for g in s:
+                b.append(self._gameToString(g, team))
+            return packing.pack(b, limit, ircutils.bold(games[0]['week']))
+
     def _gameToString(self, game, team=None):
         """ Given a game, format the information into a string according to the
         context. For example:
@@ -675,6 +723,35 @@ class NFLScores(callbacks.Plugin):
                                                                                        )
         return game_string
 
+    def _recordToString(self, team, details=False):
+        """Format a team's record as "KC 5-1", or with details as
+        "KC 5-1 (div 2-0, 150-98)"."""
+        r = self._standings.record(team)
+        record = '{}-{}'.format(r['w'], r['l'])
+        if r['t']:
+            record += '-{}'.format(r['t'])
+        if details:
+            div = '{}-{}'.format(*r['div'][:2])
+            if r['div'][2]:
+                div += '-{}'.format(r['div'][2])
+            record += ' (div {}, {}-{})'.format(div, r['pf'], r['pa'])
+        return '{} {}'.format(ircutils.bold(team), record)
+
+    def _stateToString(self, home_team, away_team, state):
+        """Format a timeline.State as "DEN 10 KC 14 Halftime (Sun 9:31 PM
+        ET)"."""
+        ended = state.qtr in ('Final', 'final overtime')
+        period = {'Final': 4, 'final overtime': 5, 'Halftime': 9,
+                  'Pregame': 0}.get(state.qtr)
+        if period is None:
+            period = int(state.qtr)
+        seen = datetime.datetime.fromtimestamp(
+            state.time, pytz.timezone('US/Eastern'))
+        return "{} {} {} {} {} ({})".format(
+            away_team, state.away_score, home_team, state.home_score,
+            self._clockBoardToString(state.clock, period, ended),
+            seen.strftime('%a %-I:%M %p ET'))
+
     def _clockBoardToString(self, clock, period, game_ended):
         """Get a string with current period and, if the game is still
         in progress, the remaining time in it."""
@@ -714,87 +791,6 @@ class NFLScores(callbacks.Plugin):
             return "OT"
         return "OT{}".format(ot_number)
 
-############################
-# Date-manipulation helpers
-############################
-    def _getTodayDate(self):
-        """Get the current date formatted as "YYYYMMDD".
-        Because the API separates games by day of start, we will consider and
-        return the date in the Pacific timezone.
-        The objective is to avoid reading future games anticipatedly when the
-        day rolls over at midnight, which would cause us to ignore games
-        in progress that may have started on the previous day.
-        Taking the west coast time guarantees that the day will advance only
-        when the whole continental US is already on that day."""
-        today = self._pacificTimeNow().date()
-        today_iso = today.isoformat()
-        return today_iso.replace('-', '')
-
-    def _easternTimeNow(self):
-        return datetime.datetime.now(pytz.timezone('US/Eastern'))
-
-    def _pacificTimeNow(self):
-        return datetime.datetime.now(pytz.timezone('US/Pacific'))
-
-    def _ISODateToEasternTime(self, iso):
-        """Convert the ISO date in UTC time that the API outputs into an
-        Eastern time formatted with am/pm. (The default human-readable format
-        for the listing of games)."""
-        date = dateutil.parser.parse(iso)
-        date_eastern = date.astimezone(pytz.timezone('US/Eastern'))
-        eastern_time = date_eastern.strftime('%-I:%M %p')
-        return "{} ET".format(eastern_time) # Strip the seconds
-
-    def _stripDateSeparators(self, date_string):
-        return date_string.replace('-', '')
-
-    def _EnglishDateToDate(self, date):
-        """Convert a human-readable like 'yesterday' to a datetime object
-        and return a 'YYYYMMDD' string."""
-        if date == "lastweek":
-            day_delta = -7
-        elif date == "yesterday":
-            day_delta = -1
-        elif date == "today" or date =="tonight":
-            day_delta = 0
-        elif date == "tomorrow":
-            day_delta = 1
-        elif date == "nextweek":
-            day_delta = 7
-        # Calculate the day difference and return a string
-        date_string = (self._pacificTimeNow() +
-                      datetime.timedelta(days=day_delta)).strftime('%Y%m%d')
-        return date_string
-
-    def _checkDateInput(self, date):
-        """Verify that the given string is a valid date formatted as
-        YYYY-MM-DD. Also, the API seems to go back until 2014-10-04, so we
-        will check that the input is not a date earlier than that."""
-
-        #weeks = {'pre1':['2016-08-11', '2016-08-14'],
-        #         'pre2':['2016-08-', '2016-08-'],
-        #         'pre3':['2016-08-', '2016-08-'],
-        #         'pre4':['2016-']}
-
-        if date is None:
-            return None
-
-        if date in self._FUZZY_DAYS:
-            date = self._EnglishDateToDate(date)
-        elif date.replace('-','').isdigit():
-            try:
-                parsed_date = datetime.datetime.strptime(date, '%Y-%m-%d')
-            except:
-                raise ValueError('Incorrect date format, should be YYYY-MM-DD')
-
-            # The current API goes back until 2014-10-04. Is it in range?
-            if parsed_date.date() <  datetime.date(2014, 10, 4):
-                raise ValueError('I can only go back until 2014-10-04')
-        else:
-            return None
-
-        return self._stripDateSeparators(date)
-
 Class = NFLScores
 
 # vim:set shiftwidth=4 softtabstop=4 expa
@@ -0,0 +1,92 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Feed sources: where the scorestrip and the game-center documents are
+downloaded from. A mirror is a local directory (or file:// URL) laid out
+like NFL.com's liveupdate tree, kept up to date by a separate job:
+
+    <mirror>/scorestrip/ss.xml
+    <mirror>/scorestrip/postseason/ss.xml
+    <mirror>/game-center/<eid>/<eid>_gtd.json
+"""
+
+import os
+import urllib.parse
+import urllib.request
+
+NFLCOM = 'http://www.nfl.com/liveupdate'
+
+SCHEDULE = {
+    'regular': '/scorestrip/ss.xml',
+    'postseason': '/scorestrip/postseason/ss.xml',
+}
+GAME = '/game-center/{}/{}_gtd.json'
+
+
+class Source(object):
+    """Feed rooted at the given URL. With season_type 'auto', the postseason
+    scorestrip is tried first in January and February, falling back to the
+    regular one (the last regular season week is played in January)."""
+    def __init__(self, base, season_type='auto'):
+        self.base = base.rstrip('/')
+        self.season_type = season_type
+
+    def scheduleURLs(self, today):
+        """Return the scorestrip URLs to try, in order."""
+        if self.season_type == 'auto':
+            if today.month in (1, 2):
+                types = ('postseason', 'regular')
+            else:
+                types = ('regular',)
+        else:
+            types = (self.season_type,)
+        return [self.base + SCHEDULE[t] for t in types]
+
+    def gameURL(self):
+        """Return the URL of the game-center documents, to be formatted
+        with the game's eid (twice)."""
+        return self.base + GAME
+
+
+class NFLComSource(Source):
+    def __init__(self, location='', season_type='auto'):
+        super(NFLComSource, self).__init__(location or NFLCOM, season_type)
+
+
+class MirrorSource(Source):
+    """Local copy of the feed. `location` is a directory or a file:// URL
+    (any other URL is used as is, eg. for a mirror served over HTTP)."""
+    def __init__(self, location, season_type='auto'):
+        if not location:
+            raise ValueError('The mirror source needs a location.')
+        if not urllib.parse.urlsplit(location).scheme:
+            location = 'file:' + urllib.request.pathname2url(
+                os.path.abspath(os.path.expanduser(location)))
+        super(MirrorSource, self).__init__(location, season_type)
+
+
+SOURCES = {
+    'nfl': NFLComSource,
+    'mirror': MirrorSource,
+}
+
+
+def get(name, location='', season_type='auto'):
+    return SOURCES[name](location, season_type)
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
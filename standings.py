@@ -0,0 +1,222 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Regular season standings, updated incrementally as games go final and
+saved to a JSON file so they survive restarts. The file may be shared with
+other processes (eg. the command line, see __main__.py): it is reloaded
+whenever it changed on disk."""
+
+import contextlib
+import itertools
+import json
+import os
+import threading
+try:
+    import fcntl
+except ImportError:
+    # No locking across processes then (Windows).
+    fcntl = None
+
+DIVISIONS = {
+    'AFC East': ['BUF', 'MIA', 'NE', 'NYJ'],
+    'AFC North': ['BAL', 'CIN', 'CLE', 'PIT'],
+    'AFC South': ['HOU', 'IND', 'JAX', 'TEN'],
+    'AFC West': ['DEN', 'KC', 'LV', 'LAC'],
+    'NFC East': ['DAL', 'NYG', 'PHI', 'WAS'],
+    'NFC North': ['CHI', 'DET', 'GB', 'MIN'],
+    'NFC South': ['ATL', 'CAR', 'NO', 'TB'],
+    'NFC West': ['ARI', 'LA', 'SF', 'SEA'],
+}
+
+# Abbreviations NFL.com used at some point for the same franchises.
+ALIASES = {
+    'JAC': 'JAX',
+    'OAK': 'LV',
+    'SD': 'LAC',
+    'STL': 'LA',
+    'LAR': 'LA',
+    'WSH': 'WAS',
+}
+
+TEAMS = dict((team, division) for (division, teams) in DIVISIONS.items()
+             for team in teams)
+
+# Division winners, then wild cards, per conference.
+PLAYOFF_TEAMS = 7
+
+
+def team(abbr):
+    return ALIASES.get(abbr, abbr)
+
+
+def newRecord():
+    # [w, l, t] lists are indexed by the outcome (0 win, 1 loss, 2 tie).
+    return {'w': 0, 'l': 0, 't': 0, 'pf': 0, 'pa': 0,
+            'div': [0, 0, 0], 'conf': [0, 0, 0], 'h2h': {}}
+
+EMPTY = newRecord()
+
+
+class Standings(object):
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self.season = None
+        self._games = set()
+        self._teams = {}
+        # (mtime, size) of the file when it was last loaded or saved.
+        self._version = None
+        self._load()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        """Reload the file if another process changed it."""
+        version = self._stat()
+        if version is None or version == self._version:
+            return
+        with open(self.filename) as fd:
+            data = json.load(fd)
+        self.season = data['season']
+        self._games = set(data['games'])
+        self._teams = data['teams']
+        self._version = version
+
+    @contextlib.contextmanager
+    def _fileLock(self):
+        """Keep other processes from updating the file meanwhile."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.filename + '.lock', 'a') as fd:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def recordFinal(self, eid, season, home, away, home_score, away_score):
+        """Account for a final regular season game. Only the two teams
+        involved are updated; games already counted, and games of a season
+        older than the current one, are ignored."""
+        (home, away) = (team(home), team(away))
+        if eid in self._games or home not in TEAMS or away not in TEAMS:
+            return False
+        with self._lock, self._fileLock():
+            self._load()
+            if self.season is not None and season < self.season:
+                return False
+            if season != self.season:
+                self.season = season
+                self._games = set()
+                self._teams = {}
+            if eid in self._games:
+                return False
+            self._games.add(eid)
+
+            result = (0 if home_score > away_score else
+                      1 if home_score < away_score else 2)
+            for (us, them, ours, theirs, outcome) in (
+                    (home, away, home_score, away_score, result),
+                    (away, home, away_score, home_score,
+                     (1, 0, 2)[result])):
+                record = self._teams.setdefault(us, newRecord())
+                record['wlt'[outcome]] += 1
+                record['pf'] += ours
+                record['pa'] += theirs
+                if TEAMS[us] == TEAMS[them]:
+                    record['div'][outcome] += 1
+                if TEAMS[us][:3] == TEAMS[them][:3]:
+                    record['conf'][outcome] += 1
+                record['h2h'].setdefault(them, [0, 0, 0])[outcome] += 1
+            self._save()
+        return True
+
+    def _save(self):
+        tmp = '{}.{}.tmp'.format(self.filename, os.getpid())
+        with open(tmp, 'w') as fd:
+            json.dump({'season': self.season, 'games': sorted(self._games),
+                       'teams': self._teams}, fd)
+        os.replace(tmp, self.filename)
+        self._version = self._stat()
+
+    def _refresh(self):
+        with self._lock:
+            self._load()
+
+    def record(self, abbr):
+        """Return the record of a team, as a dict (w, l, t, pf, pa, div,
+        conf, h2h). Don't modify it."""
+        self._refresh()
+        return self._record(abbr)
+
+    def _record(self, abbr):
+        return self._teams.get(abbr, EMPTY)
+
+    def _pct(self, abbr):
+        r = self._record(abbr)
+        return pct(r['w'], r['l'], r['t'])
+
+    def _tiebreaker(self, abbr, tied):
+        """Sort key among teams with the same win percentage: head-to-head
+        record against the other tied teams (neutral if they didn't play),
+        then division and conference records, then point differential."""
+        r = self._record(abbr)
+        h2h = [0, 0, 0]
+        for other in tied:
+            if other != abbr:
+                for (outcome, n) in enumerate(r['h2h'].get(other, ())):
+                    h2h[outcome] += n
+        return (pct(*h2h) if sum(h2h) else 0.5, pct(*r['div']),
+                pct(*r['conf']), r['pf'] - r['pa'])
+
+    def _ranked(self, teams):
+        """Return the teams, best first."""
+        ranked = []
+        for (_, tied) in itertools.groupby(
+                sorted(teams, key=self._pct, reverse=True), key=self._pct):
+            tied = list(tied)
+            ranked += sorted(tied, key=lambda t: self._tiebreaker(t, tied),
+                             reverse=True)
+        return ranked
+
+    def division(self, name):
+        """Return the teams of the division, best first."""
+        self._refresh()
+        return self._ranked(DIVISIONS[name])
+
+    def playoffs(self, conference):
+        """Return the conference's seeds: division leaders first, then the
+        best remaining teams."""
+        self._refresh()
+        divisions = [d for d in DIVISIONS if d.startswith(conference)]
+        leaders = [self.division(d)[0] for d in divisions]
+        others = [t for d in divisions for t in self.division(d)[1:]]
+        return (self._ranked(leaders) + self._ranked(others))[:PLAYOFF_TEAMS]
+
+
+def pct(w, l, t):
+    games = w + l + t
+    return (w + t / 2.0) / games if games else 0.0
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
@@ -29,10 +29,454 @@
 ###
 
 from supybot.test import *
+import supybot.test
 
+import datetime
+import io
+import os
+import pytz
+import shutil
+import tempfile
 
-class NBATestCase(PluginTestCase):
-    plugins = ('NBA',)
+from . import freshness
+from . import leaders
+from . import packing
+from . import parsecache
+from . import pipeline
+from . import plugin
+from . import playindex
+from . import sources
+from . import standings
+from . import throttle
+from . import timeline
+
+
+class ThrottleTestCase(SupyTestCase):
+    def testFirstRequestBypassesChannel(self):
+        t = throttle.Throttle()
+        limits = (2, 30)
+        self.assertTrue(t.allow('a', '#c', limits, (1, 60), now=100))
+        self.assertFalse(t.allow('a', '#c', limits, (1, 60), now=100))
+        # The channel is out of tokens, but b hasn't asked for anything yet.
+        self.assertTrue(t.allow('b', '#c', limits, (1, 60), now=100))
+        self.assertFalse(t.allow('b', '#c', limits, (1, 60), now=100))
+        # b's token was given back, since the request didn't run.
+        self.assertTrue(t.allow('b', None, limits, (1, 60), now=100))
+
+    def testReplayed(self):
+        t = throttle.Throttle()
+        t.remember('nfl', 'A', ['x'], now=100)
+        self.assertEqual(t.recall('nfl', 60, now=110),
+                         (10, frozenset(['A']), ['x']))
+        t.replayed('nfl', 'B')
+        self.assertEqual(t.recall('nfl', 60, now=110)[1],
+                         frozenset(['A', 'B']))
+        self.assertEqual(t.recall('nfl', 5, now=110), None)
+
+
+class FreshnessTestCase(SupyTestCase):
+    POLICY = freshness.Policy(live=10, halftime=60, missing=120,
+                              pregame=1800)
+
+    def testKickoff(self):
+        eastern = pytz.timezone('US/Eastern')
+        for (time, meridiem, expected) in (('9:30', 'PM', '09:30'),
+                                           ('1:00', 'PM', '13:00'),
+                                           ('8:20', None, '20:20'),
+                                           ('12:00', 'AM', '12:00')):
+            kickoff = pipeline.Pipeline()._kickoff({
+                'eid': '2026101100', 'month': 10, 'day': 11, 'time': time,
+                'meridiem': meridiem})
+            self.assertEqual(datetime.datetime.fromtimestamp(
+                kickoff, eastern).strftime('%H:%M'), expected)
+
+    def testExpiry(self):
+        (now, policy) = (100000, self.POLICY)
+        expiry = freshness.expiry
+        for qtr in ('Final', 'final overtime'):
+            self.assertEqual(expiry({'qtr': qtr}, now - 9000, now, policy),
+                             freshness.FOREVER)
+        self.assertEqual(expiry({'qtr': 'Halftime'}, now - 3600, now, policy),
+                         now + 60)
+        self.assertEqual(expiry({'qtr': '3'}, now - 5400, now, policy),
+                         now + 10)
+        # Before kickoff: not until the pregame window (or soon, if in it).
+        for qtr in ('Pregame', None):
+            self.assertEqual(expiry({'qtr': qtr}, now + 7200, now, policy),
+                             now + 7200 - 1800)
+            self.assertEqual(expiry({'qtr': qtr}, now + 600, now, policy),
+                             now + 10)
+        # No document yet.
+        self.assertEqual(expiry(None, now + 7200, now, policy),
+                         now + 7200 - 1800)
+        self.assertEqual(expiry(None, now - 600, now, policy), now + 120)
+
+    def testGameCache(self):
+        cache = freshness.GameCache()
+        self.assertEqual(cache.get('a', 100), (False, None))
+        cache.put('a', None, 200)
+        self.assertEqual(cache.get('a', 100), (True, None))
+        self.assertEqual(cache.get('a', 200), (False, None))
+        cache.put('b', {'qtr': 'Final'}, freshness.FOREVER)
+        cache.retain(['b'])
+        self.assertEqual(cache.get('a', 100), (False, None))
+        self.assertEqual(cache.get('b', 100), (True, {'qtr': 'Final'}))
+
+
+class LeadersTestCase(SupyTestCase):
+    @staticmethod
+    def rushers(*yards):
+        return {'stats': {'rushing': dict(
+            (str(i), {'name': 'R{}'.format(y), 'att': 10, 'yds': y, 'tds': 0})
+            for (i, y) in enumerate(yards))}}
+
+    def testTeamTables(self):
+        l = leaders.Leaders(size=2)
+        game = {'home': self.rushers(10, 5, 1),
+                'away': self.rushers(90, 80, 70)}
+        l.update('2026101100', 'KC', 'DEN', game)
+        self.assertEqual([e[1] for e in l.get('rushing')], ['R90', 'R80'])
+        self.assertEqual([e[1] for e in l.get('rushing', 'KC')],
+                         ['R10', 'R5'])
+        self.assertEqual(l.get('passing', 'KC'), [])
+
+    def testUpdateAndRetain(self):
+        l = leaders.Leaders(size=2)
+        game = {'home': self.rushers(10), 'away': self.rushers(20)}
+        l.update('2026101100', 'KC', 'DEN', game)
+        l.update('2026101101', 'NE', 'NYJ', {'home': self.rushers(30),
+                                             'away': self.rushers(5)})
+        self.assertEqual(len(l), 2)
+        # The same document again is skipped, a new one replaces the game.
+        game['home'] = self.rushers(100)
+        l.update('2026101100', 'KC', 'DEN', game)
+        self.assertEqual(l.get('rushing', 'KC')[0][0], 10)
+        l.update('2026101100', 'KC', 'DEN', dict(game))
+        self.assertEqual(l.get('rushing', 'KC')[0][0], 100)
+        l.retain(['2026101101'])
+        self.assertEqual(len(l), 1)
+        self.assertEqual([e[2] for e in l.get('rushing')], ['NE', 'NYJ'])
+
+
+class PackingTestCase(SupyTestCase):
+    def testPack(self):
+        self.assertEqual(packing.pack([], 10), [])
+        self.assertEqual(packing.pack(['aa', 'bb', 'cc'], 7), ['aa | bb', 'cc'])
+        # The prefix only starts the first line, and counts there.
+        self.assertEqual(packing.pack(['aa', 'bb', 'cc'], 9, 'W5: '),
+                         ['W5: aa', 'bb | cc'])
+
+    def testOversizedItem(self):
+        self.assertEqual(packing.pack(['aa', 'b' * 12, 'cc'], 10),
+                         ['aa', 'b' * 12, 'cc'])
+        self.assertEqual(packing.pack(['b' * 12], 10, 'W5: '),
+                         ['W5: ' + 'b' * 12])
+
+    def testFormattingCodes(self):
+        bold = ircutils.bold('aa')
+        red = ircutils.mircColor('bb', 'red')
+        self.assertEqual(packing.size(bold), 4)
+        self.assertEqual(packing.size(red), 6)
+        self.assertEqual(packing.pack([bold, red], 13), [bold + ' | ' + red])
+        self.assertEqual(packing.pack([bold, red], 12), [bold, red])
+        self.assertEqual(packing.size('\xe9'), 2)
+
+    def testRefit(self):
+        lines = ['W5: aa | bb | cc', 'dd | ee']
+        self.assertEqual(packing.refit(lines, 16), lines)
+        self.assertEqual(packing.refit(lines, 12),
+                         ['W5: aa | bb', 'cc', 'dd | ee'])
+
+
+class ParseCacheTestCase(SupyTestCase):
+    def testGet(self):
+        cache = parsecache.ParseCache(size=2)
+        parsed = []
+        def parse(body):
+            parsed.append(body)
+            return body.upper()
+        self.assertEqual(cache.get('json', b'a', parse), b'A')
+        self.assertEqual(cache.get('json', b'a', parse), b'A')
+        self.assertEqual(parsed, [b'a'])
+        # The kind and the extra key are part of the key.
+        cache.get('schedule', b'a', parse)
+        cache.get('schedule', b'a', parse, 'KC')
+        self.assertEqual(parsed, [b'a', b'a', b'a'])
+        self.assertEqual(cache.stats(), (1, 3, 2))
+
+    def testEviction(self):
+        cache = parsecache.ParseCache(size=2)
+        parsed = []
+        def parse(body):
+            parsed.append(body)
+            return body
+        cache.get('json', b'a', parse)
+        cache.get('json', b'b', parse)
+        cache.get('json', b'a', parse)  # b is now the oldest.
+        cache.get('json', b'c', parse)
+        cache.get('json', b'a', parse)
+        cache.get('json', b'b', parse)
+        self.assertEqual(parsed, [b'a', b'b', b'c', b'b'])
+
+
+class PlayIndexTestCase(SupyTestCase):
+    GAME = {'drives': {'crntdrv': 1, '1': {'plays': {
+        '35': {'desc': 'P.Mahomes pass short right to T.Kelce, TOUCHDOWN.',
+               'qtr': 1, 'posteam': 'KC', 'players': {}},
+    }}}}
+
+    def setUp(self):
+        SupyTestCase.setUp(self)
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'plays.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        SupyTestCase.tearDown(self)
+
+    def testSharedDatabase(self):
+        first = playindex.PlayIndex(self.filename)
+        second = playindex.PlayIndex(self.filename)
+        # The second one has already looked at the game, and doesn't know
+        # the first one indexed its play since.
+        second.add('2026101100', '2026', '5', 'KC', 'DEN', {'drives': {}})
+        first.add('2026101100', '2026', '5', 'KC', 'DEN', self.GAME)
+        second.add('2026101100', '2026', '5', 'KC', 'DEN', dict(self.GAME))
+        plays = second.search(['touchdown'])
+        self.assertEqual([(p.eid, p.team) for p in plays],
+                         [('2026101100', 'KC')])
+        first.close()
+        second.close()
+
+    def testOlderSeason(self):
+        index = playindex.PlayIndex(self.filename)
+        index.add('2026101100', '2026', '5', 'KC', 'DEN', self.GAME)
+        index.add('2018090600', '2018', '1', 'PHI', 'ATL', self.GAME)
+        self.assertEqual([p.eid for p in index.search(['touchdown'])],
+                         ['2026101100'])
+        index.close()
+
+
+class TimelineTestCase(SupyTestCase):
+    @staticmethod
+    def game(qtr, clock, home, away):
+        return {'qtr': qtr, 'clock': clock, 'posteam': 'KC',
+                'home': {'score': {'T': home}},
+                'away': {'score': {'T': away}}}
+
+    def testLookups(self):
+        t = timeline.Timeline(':memory:')
+        eid = '2026101100'
+        t.record(eid, 'KC', 'DEN', self.game('Pregame', '15:00', 0, 0), 100)
+        t.record(eid, 'KC', 'DEN', self.game(1, '02:00', 7, 0), 200)
+        t.record(eid, 'KC', 'DEN', self.game(1, '02:00', 7, 0), 250)
+        t.record(eid, 'KC', 'DEN', self.game(2, '00:10', 7, 3), 300)
+        t.record(eid, 'KC', 'DEN', self.game('Halftime', '00:00', 10, 3),
+                 400)
+        t.record(eid, 'KC', 'DEN', self.game(3, '11:00', 10, 3), 500)
+
+        self.assertEqual(t.latestGame('DEN'), (eid, 'KC', 'DEN'))
+        self.assertEqual(t.latestGame('DEN', before=eid), None)
+        self.assertEqual(t.at(eid, 50), None)
+        # The unchanged state at 250 wasn't recorded again.
+        self.assertEqual(t.at(eid, 299).time, 200)
+        self.assertEqual(t.atPeriod(eid, 'q1').home_score, 7)
+        self.assertEqual(t.atPeriod(eid, 'half').home_score, 10)
+        self.assertEqual(t.atPeriod(eid, 'q2').away_score, 3)
+        self.assertEqual(t.atPeriod(eid, 'end').clock, '11:00')
+        self.assertEqual(t.atPeriod(eid, 'q4'), None)
+        t.close()
+
+
+class SourcesTestCase(SupyTestCase):
+    def testScheduleURLs(self):
+        source = sources.get('nfl')
+        base = sources.NFLCOM
+        self.assertEqual(source.scheduleURLs(datetime.date(2026, 10, 11)),
+                         [base + '/scorestrip/ss.xml'])
+        self.assertEqual(source.scheduleURLs(datetime.date(2027, 1, 9)),
+                         [base + '/scorestrip/postseason/ss.xml',
+                          base + '/scorestrip/ss.xml'])
+        source = sources.get('nfl', 'http://example.com/', 'regular')
+        self.assertEqual(source.scheduleURLs(datetime.date(2027, 1, 9)),
+                         ['http://example.com/scorestrip/ss.xml'])
+        self.assertEqual(source.gameURL().format('1', '1'),
+                         'http://example.com/game-center/1/1_gtd.json')
+
+    def testMirror(self):
+        self.assertRaises(ValueError, sources.get, 'mirror')
+        source = sources.get('mirror', '/srv/nfl/')
+        self.assertEqual(source.base, 'file:/srv/nfl')
+        self.assertEqual(source.scheduleURLs(datetime.date(2026, 10, 11)),
+                         ['file:/srv/nfl/scorestrip/ss.xml'])
+        source = sources.get('mirror', 'http://mirror.example.com/nfl')
+        self.assertEqual(source.base, 'http://mirror.example.com/nfl')
+
+
+class StandingsTestCase(SupyTestCase):
+    def setUp(self):
+        SupyTestCase.setUp(self)
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'standings.json')
+        self.standings = standings.Standings(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        SupyTestCase.tearDown(self)
+
+    def testRecordFinal(self):
+        s = self.standings
+        self.assertTrue(s.recordFinal('2026091000', '2026', 'KC', 'DEN',
+                                      24, 17))
+        self.assertFalse(s.recordFinal('2026091000', '2026', 'KC', 'DEN',
+                                       24, 17))
+        # Different conferences, and an alias (OAK is LV).
+        self.assertTrue(s.recordFinal('2026091700', '2026', 'OAK', 'GB',
+                                      20, 20))
+        kc = s.record('KC')
+        self.assertEqual((kc['w'], kc['l'], kc['t']), (1, 0, 0))
+        self.assertEqual((kc['pf'], kc['pa']), (24, 17))
+        self.assertEqual(kc['div'], [1, 0, 0])
+        self.assertEqual(kc['conf'], [1, 0, 0])
+        self.assertEqual(kc['h2h'], {'DEN': [1, 0, 0]})
+        self.assertEqual(s.record('DEN')['div'], [0, 1, 0])
+        lv = s.record('LV')
+        self.assertEqual((lv['w'], lv['l'], lv['t']), (0, 0, 1))
+        self.assertEqual(lv['div'], [0, 0, 0])
+        self.assertEqual(lv['conf'], [0, 0, 0])
+        self.assertEqual(s.record('GB')['h2h'], {'LV': [0, 0, 1]})
+        # Saved, and the games counted are remembered.
+        s = standings.Standings(self.filename)
+        self.assertEqual(s.record('KC')['w'], 1)
+        self.assertFalse(s.recordFinal('2026091000', '2026', 'KC', 'DEN',
+                                       24, 17))
+
+    def testSharedFile(self):
+        other = standings.Standings(self.filename)
+        self.assertTrue(self.standings.recordFinal('2026091000', '2026',
+                                                   'KC', 'DEN', 24, 17))
+        self.assertTrue(other.recordFinal('2026091001', '2026',
+                                          'NE', 'NYJ', 21, 3))
+        for s in (self.standings, other,
+                  standings.Standings(self.filename)):
+            self.assertEqual(s.record('KC')['w'], 1)
+            self.assertEqual(s.record('NE')['w'], 1)
+
+    def testOlderSeason(self):
+        s = self.standings
+        s.recordFinal('2026091000', '2026', 'KC', 'DEN', 24, 17)
+        self.assertFalse(s.recordFinal('2018090600', '2018', 'PHI', 'ATL',
+                                       18, 12))
+        self.assertEqual(s.season, '2026')
+        self.assertEqual(s.record('KC')['w'], 1)
+        self.assertEqual(s.record('PHI')['w'], 0)
+
+    def testHeadToHead(self):
+        s = self.standings
+        # KC and DEN are both 1-1 (in the division too), KC with the better
+        # point differential; but DEN beat KC.
+        s.recordFinal('2026091000', '2026', 'KC', 'DEN', 10, 13)
+        s.recordFinal('2026091700', '2026', 'KC', 'LV', 40, 0)
+        s.recordFinal('2026092400', '2026', 'DEN', 'LAC', 0, 40)
+        self.assertEqual(s.division('AFC West'), ['LAC', 'DEN', 'KC', 'LV'])
+
+
+class NFLScoresTestCase(ChannelPluginTestCase):
+    plugins = ('NFLScores',)
+
+    def testThrottledReplay(self):
+        cb = self.irc.getCallback('NFLScores')
+        with conf.supybot.plugins.NFLScores.throttle.user.burst.context(1):
+            # The user's single token is gone; the last reply went to
+            # another channel.
+            cb._throttle.allow((self.irc.network,
+                                ircutils.hostFromHostmask(self.prefix)),
+                               None, (1, 30), (6, 10))
+            cb._throttle.remember(('nfl', None), (self.irc.network, '#a'),
+                                  ['line 1', 'line 2'])
+            self.assertResponse('nfl', 'line 1')
+            self.assertEqual(self.irc.takeMsg().args[1],
+                             '{}: line 2'.format(self.nick))
+            # It is in this channel's backlog now.
+            self.assertRegexp('nfl', 'Unchanged since')
+            self.assertIsNone(self.irc.takeMsg())
+
+    def testThrottledReplayRefits(self):
+        cb = self.irc.getCallback('NFLScores')
+        msg = ircmsgs.privmsg(self.channel, 'nfl', prefix=self.prefix)
+        overhead = 512 - cb._lineBytes(self.irc, msg)
+        with conf.supybot.plugins.NFLScores.throttle.user.burst.context(1), \
+                conf.supybot.plugins.NFLScores.lineBytes.context(
+                    overhead + 12):
+            cb._throttle.allow((self.irc.network,
+                                ircutils.hostFromHostmask(self.prefix)),
+                               None, (1, 30), (6, 10))
+            # Packed for a target with less overhead.
+            cb._throttle.remember(('nfl', None), (self.irc.network, '#a'),
+                                  ['W5: aa | bb | cc'])
+            self.assertResponse('nfl', 'W5: aa | bb')
+            self.assertEqual(self.irc.takeMsg().args[1],
+                             '{}: cc'.format(self.nick))
+
+    def testUnloadRemovesConfCallback(self):
+        enable = conf.supybot.plugins.NFLScores.web.enable
+        callback = self.irc.getCallback('NFLScores')._http_conf_callback
+        self.assertIn(callback, [c[0] for c in enable._callbacks])
+        self.assertNotError('unload NFLScores')
+        self.assertNotIn(callback, [c[0] for c in enable._callbacks])
+
+
+class NFLScoresHTTPTestCase(HTTPPluginTestCase):
+    plugins = ('NFLScores',)
+    GAMES = [{'home_team': 'KC', 'away_team': 'DEN', 'home_score': 24,
+              'away_score': 17, 'period': 'Final', 'ended': True,
+              'clock': '00:00', 'redzone': False, 'posteam': 'KC',
+              'week': 'Week 5: ', 'week_number': '5', 'date': 11,
+              'eid': '2026101100'}]
+
+    def requestWith(self, url, headers):
+        wfile = io.BytesIO()
+        rfile = io.BytesIO()
+        connection = supybot.test.FakeHTTPConnection(wfile, rfile)
+        connection.putrequest('GET', url)
+        for (name, value) in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders()
+        rfile.seek(0)
+        return supybot.test.TestRequestHandler(rfile, wfile)._response
+
+    def testNotModified(self):
+        cb = self.irc.getCallback('NFLScores')
+        with conf.supybot.plugins.NFLScores.web.enable.context(True), \
+                conf.supybot.plugins.NFLScores.web.maxAge.context(3600):
+            cb._updateSnapshot(self.GAMES)
+            (body, etag) = cb._snapshotAsJSON()
+            self.assertHTTPResponse('/nflscores/', 200)
+            # A refresh that didn't change any game.
+            cb._updateSnapshot(self.GAMES)
+            for header in (etag, etag[2:], '"foo", ' + etag, '*'):
+                self.assertEqual(self.requestWith(
+                    '/nflscores/', {'If-None-Match': header}), 304)
+            self.assertEqual(self.requestWith(
+                '/nflscores/', {'If-None-Match': '"foo"'}), 200)
+            cb._updateSnapshot([dict(self.GAMES[0], home_score=31)])
+            self.assertEqual(self.requestWith(
+                '/nflscores/', {'If-None-Match': etag}), 200)
+
+    def testSnapshotLines(self):
+        cb = self.irc.getCallback('NFLScores')
+        lines = cb._updateSnapshot(self.GAMES, 400).lines[400]
+        self.assertEqual(len(lines), 1)
+        self.assertIn('DEN 17', lines[0])
+        # Refreshes (eg. from the HTTP callback) keep the packed line sizes,
+        # reusing the lines if no game changed.
+        self.assertIs(cb._updateSnapshot(self.GAMES).lines[400], lines)
+        snapshot = cb._updateSnapshot([dict(self.GAMES[0], home_score=31)])
+        self.assertIn('KC 31', snapshot.lines[400][0])
+        for limit in range(100, 120):
+            snapshot = cb._updateSnapshot(self.GAMES, limit)
+        self.assertEqual(sorted(snapshot.lines),
+                         list(range(120 - plugin.SNAPSHOT_LIMITS, 120)))
 
 
 # vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
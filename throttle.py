@@ -0,0 +1,127 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Per-user and per-channel command throttling (token buckets), and the
+cache of recent replies used to answer throttled requests."""
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Holds up to `burst` tokens, and gets a new one every `period`
+    seconds."""
+    def __init__(self, burst, period, now):
+        self.burst = burst
+        self.period = period
+        self.tokens = float(burst)
+        self.last = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.last) / self.period)
+        self.last = now
+
+    def full(self):
+        return self.tokens >= self.burst
+
+    def consume(self):
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class Throttle(object):
+    """Decides whether a request may run the scores pipeline. Users whose
+    bucket is full (first-time or idle requesters) are not held back by
+    the channel's bucket, so a few heavy users can't lock everyone else
+    out of a channel."""
+    # Above this many buckets, the idle (full) ones are dropped.
+    MAX_BUCKETS = 1000
+
+    def __init__(self):
+        self._users = {}
+        self._channels = {}
+        self._replies = {}
+        self._lock = threading.Lock()
+
+    def allow(self, user, channel, user_limits, channel_limits, now=None):
+        """Return whether the request of `user` in `channel` (None for
+        private messages) may run. Limits are (burst, period) tuples."""
+        now = now or time.time()
+        with self._lock:
+            user_bucket = self._bucket(self._users, user, user_limits, now)
+            first = user_bucket.full()
+            if not user_bucket.consume():
+                return False
+            if channel is None:
+                return True
+            channel_bucket = self._bucket(self._channels, channel,
+                                          channel_limits, now)
+            if channel_bucket.consume() or first:
+                return True
+            # Give the user's token back, the request didn't run.
+            user_bucket.tokens += 1
+            return False
+
+    def _bucket(self, buckets, key, limits, now):
+        (burst, period) = limits
+        bucket = buckets.get(key)
+        if bucket is None or (bucket.burst, bucket.period) != limits:
+            if len(buckets) >= self.MAX_BUCKETS:
+                self._prune(buckets, now)
+            bucket = buckets[key] = TokenBucket(burst, period, now)
+        else:
+            bucket.refill(now)
+        return bucket
+
+    def _prune(self, buckets, now):
+        for (key, bucket) in list(buckets.items()):
+            bucket.refill(now)
+            if bucket.full():
+                del buckets[key]
+
+    def remember(self, request, target, replies, now=None):
+        """Store the replies given to a request, and where they were
+        sent."""
+        with self._lock:
+            if len(self._replies) >= self.MAX_BUCKETS:
+                self._replies.clear()
+            self._replies[request] = (now or time.time(),
+                                      frozenset([target]), replies)
+
+    def replayed(self, request, target):
+        """Record that the last replies to the request were sent again, to
+        another target."""
+        with self._lock:
+            cached = self._replies.get(request)
+            if cached is not None:
+                self._replies[request] = (cached[0], cached[1] | {target},
+                                          cached[2])
+
+    def recall(self, request, max_age, now=None):
+        """Return (age, targets, replies) of the last answer to the request,
+        or None if there is none younger than `max_age` seconds."""
+        now = now or time.time()
+        cached = self._replies.get(request)
+        if cached is None or now - cached[0] > max_age:
+            return None
+        return (now - cached[0], cached[1], cached[2])
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
@@ -0,0 +1,141 @@
+###
+# Copyright (c) 2016, Santiago Gil
+# adapted by cottongin
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###
+
+"""Append-only log of the game states observed in the game-center documents
+(score, quarter, clock, possession), stored in SQLite and indexed by game and
+time, so that past states can be looked up without downloading anything."""
+
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+State = namedtuple('State', 'eid time qtr clock home_score away_score posteam')
+
+# Period names accepted by Timeline.atPeriod, and the quarter they close.
+PERIODS = {
+    'q1': '1',
+    'q2': '2',
+    'half': '2',
+    'halftime': '2',
+    'q3': '3',
+    'q4': '4',
+    'ot': '5',
+}
+
+
+class Timeline(object):
+    def __init__(self, filename):
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Last recorded (qtr, clock, scores, posteam) of each game.
+        self._last = {}
+        with self._lock, self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS games (
+                    eid TEXT PRIMARY KEY,
+                    home TEXT,
+                    away TEXT
+                );
+                CREATE INDEX IF NOT EXISTS games_home ON games (home, eid);
+                CREATE INDEX IF NOT EXISTS games_away ON games (away, eid);
+                CREATE TABLE IF NOT EXISTS states (
+                    eid TEXT,
+                    time INTEGER,
+                    qtr TEXT,
+                    clock TEXT,
+                    home_score INTEGER,
+                    away_score INTEGER,
+                    posteam TEXT
+                );
+                CREATE INDEX IF NOT EXISTS states_time
+                    ON states (eid, time);
+                CREATE INDEX IF NOT EXISTS states_qtr
+                    ON states (eid, qtr, time);
+                """)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def record(self, eid, home, away, game, now=None):
+        """Append the state of the given game-center document, if it changed
+        since the last one recorded for that game."""
+        state = (str(game['qtr']), game['clock'],
+                 game['home']['score']['T'], game['away']['score']['T'],
+                 game['posteam'])
+        if self._last.get(eid) == state:
+            return
+        with self._lock, self._db:
+            if eid not in self._last:
+                self._db.execute("""INSERT OR IGNORE INTO games
+                                    VALUES (?, ?, ?)""", (eid, home, away))
+                last = self._db.execute("""SELECT qtr, clock, home_score,
+                                           away_score, posteam FROM states
+                                           WHERE eid=? ORDER BY time DESC
+                                           LIMIT 1""", (eid,)).fetchone()
+                if last == state:
+                    self._last[eid] = state
+                    return
+            self._db.execute("""INSERT INTO states VALUES
+                                (?, ?, ?, ?, ?, ?, ?)""",
+                             (eid, int(now or time.time())) + state)
+            self._last[eid] = state
+
+    def latestGame(self, team, before='9'):
+        """Return (eid, home, away) of the team's most recent game in the
+        log (whose eid sorts before `before`, eg. a date), or None."""
+        with self._lock:
+            return self._db.execute("""SELECT eid, home, away FROM games
+                                       WHERE (home=? OR away=?) AND eid<?
+                                       ORDER BY eid DESC LIMIT 1""",
+                                    (team, team, before)).fetchone()
+
+    def at(self, eid, timestamp):
+        """Return the State of the game at the given time (the last one
+        recorded before it), or None."""
+        with self._lock:
+            row = self._db.execute("""SELECT * FROM states
+                                      WHERE eid=? AND time<=?
+                                      ORDER BY time DESC LIMIT 1""",
+                                   (eid, int(timestamp))).fetchone()
+        return State(*row) if row else None
+
+    def atPeriod(self, eid, period):
+        """Return the State of the game at the end of the given period (one
+        of PERIODS, or 'end' for the latest state), or None."""
+        with self._lock:
+            if period == 'end':
+                row = self._db.execute("""SELECT * FROM states WHERE eid=?
+                                          ORDER BY time DESC LIMIT 1""",
+                                       (eid,)).fetchone()
+            else:
+                row = None
+                if period in ('half', 'halftime'):
+                    row = self._db.execute("""SELECT * FROM states
+                                              WHERE eid=? AND qtr='Halftime'
+                                              ORDER BY time LIMIT 1""",
+                                           (eid,)).fetchone()
+                if row is None:
+                    row = self._db.execute("""SELECT * FROM states
+                                              WHERE eid=? AND qtr=?
+                                              ORDER BY time DESC LIMIT 1""",
+                                           (eid, PERIODS[period])).fetchone()
+        return State(*row) if row else None
+
+# vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79: